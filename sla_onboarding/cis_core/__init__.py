@@ -0,0 +1 @@
+"""Shared building blocks for the pg17, mysql80 and mariadb1011 CIS checkers."""
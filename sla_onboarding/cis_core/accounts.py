@@ -0,0 +1,64 @@
+"""Single-pass mysql.user account classifier shared by the MySQL and MariaDB checkers.
+
+Checks 4.2 and 4.4-4.6 used to run one query each against mysql.user (root
+accounts, anonymous accounts, wildcard hosts, empty passwords). Instead the
+table is scanned once through a streaming (unbuffered / server-side) cursor
+and every account is assigned to all findings it matches. Per finding only a
+count and the first few accounts are kept, so memory stays bounded however
+many accounts the server has.
+"""
+from cis_core.primitives import as_text
+
+ACCOUNT_QUERY = "SELECT User, Host, authentication_string FROM mysql.user;"
+DEFAULT_BATCH_SIZE = 1000   # rows fetched per fetchmany() call
+DEFAULT_MAX_EXAMPLES = 50   # accounts listed per finding in the report
+
+
+# Finding name -> predicate(user, host, authentication_string)
+FINDINGS = (
+    ('root', lambda user, host, auth: user == 'root'),
+    ('root_with_password', lambda user, host, auth: user == 'root' and bool(auth)),
+    ('anonymous', lambda user, host, auth: user == ''),
+    ('wildcard_host', lambda user, host, auth: host == '%'),
+    ('empty_password', lambda user, host, auth: not auth),
+)
+
+
+class AccountFinding:
+    """Number of accounts matching one finding and the first max_examples of them."""
+
+    def __init__(self, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.count = 0
+        self.examples = []
+        self.max_examples = max_examples
+
+    def add(self, user, host):
+        self.count += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append(f"{user}@{host}")
+
+    @property
+    def omitted(self):
+        return self.count - len(self.examples)
+
+
+def classify_accounts(cursor, batch_size=DEFAULT_BATCH_SIZE, max_examples=DEFAULT_MAX_EXAMPLES):
+    """Scans mysql.user once and returns ({finding name: AccountFinding}, accounts scanned).
+
+    cursor should be a streaming cursor (see Driver.stream_cursor); rows are
+    fetched batch_size at a time. Driver errors are raised to the caller.
+    """
+    findings = {name: AccountFinding(max_examples) for name, _ in FINDINGS}
+    scanned = 0
+    cursor.execute(ACCOUNT_QUERY)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for user, host, auth in rows:
+            user, host, auth = as_text(user), as_text(host), as_text(auth)
+            scanned += 1
+            for name, matches in FINDINGS:
+                if matches(user, host, auth):
+                    findings[name].add(user, host)
+    return findings, scanned
@@ -0,0 +1,435 @@
+"""Benchmark harness shared by the CIS checkers.
+
+A checker script is run end to end (as __main__) inside a temporary working
+directory, against fakes instead of a real server and host:
+
+- FakeCursor answers queries from regex rules and sleeps a configurable
+  latency per query, so every SQL round trip costs what it would on the wire;
+- FakeShell replaces subprocess.run, so run_shell_command and the cis_core
+  helpers never spawn a process: commands are answered from rules and each
+  call sleeps the configured cost of a fork/exec.
+- FakeHost points the host probes (/proc walks, home directories, systemd
+  unit directories, mountinfo, the crypto policy, binary lookups) at a
+  fixture tree in the temporary directory, so the measurements do not depend
+  on the processes, users and units of the machine running the benchmark.
+
+Round trips and subprocesses are attributed to the check that was running on
+the calling thread. The measurements can be saved as a baseline (JSON) and
+later runs compared against it.
+"""
+import io
+import json
+import os
+import re
+import runpy
+import subprocess
+import sys
+import threading
+import time
+import types
+from collections import namedtuple
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+
+from cis_core import homescan, hostprobe, procscan
+from cis_core.drivers import unload_drivers
+from cis_core.sink import ResultSink
+
+SETUP = '(setup)'  # work done before the first check started
+
+# A regex is searched in the query / command; the answer is rows (or stdout),
+# an exception instance to raise, or a callable(text) returning either.
+SqlRule = namedtuple('SqlRule', ['pattern', 'rows', 'latency'])
+ShellRule = namedtuple('ShellRule', ['pattern', 'stdout', 'returncode', 'latency'])
+
+BenchResult = namedtuple('BenchResult', [
+    'name',          # checker name, e.g. 'pg17'
+    'total',         # seconds for the whole script
+    'round_trips',   # SQL statements executed
+    'subprocesses',  # subprocess.run calls
+    'checks',        # {check_id: {'ms': ..., 'sql': ..., 'proc': ...}}
+])
+
+
+def sql_rule(pattern, rows, latency=None):
+    """Rule for FakeCursor; latency (seconds) overrides the cursor default."""
+    return SqlRule(re.compile(pattern, re.IGNORECASE), rows, latency)
+
+
+def shell_rule(pattern, stdout='', returncode=0, latency=None):
+    """Rule for FakeShell; latency (seconds) overrides the shell default."""
+    return ShellRule(re.compile(pattern), stdout, returncode, latency)
+
+
+class CheckTracker:
+    """Counts round trips and subprocesses per check.
+
+    While installed, ResultSink.begin_check also records the check id for the
+    calling thread, which is the check any query or command on that thread
+    belongs to.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return getattr(self._local, 'check_id', SETUP)
+
+    def count(self, kind):
+        check_id = self.current()
+        with self._lock:
+            counts = self.counts.setdefault(check_id, {'sql': 0, 'proc': 0})
+            counts[kind] += 1
+
+    def total(self, kind):
+        return sum(counts[kind] for counts in self.counts.values())
+
+    @contextmanager
+    def installed(self):
+        original = ResultSink.begin_check
+        tracker = self
+
+        def begin_check(sink, check_id, title):
+            tracker._local.check_id = check_id
+            return original(sink, check_id, title)
+
+        ResultSink.begin_check = begin_check
+        try:
+            yield self
+        finally:
+            ResultSink.begin_check = original
+
+
+class FakeCursor:
+    """DB-API cursor answering execute() from SqlRules after sleeping the query latency.
+
+    Queries no rule matches return no rows.
+    """
+
+    def __init__(self, rules, latency, tracker):
+        self.rules = rules
+        self.latency = latency
+        self.tracker = tracker
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.tracker.count('sql')
+        text = ' '.join(sql.split())
+        rule = next((rule for rule in self.rules if rule.pattern.search(text)), None)
+        time.sleep(self.latency if rule is None or rule.latency is None else rule.latency)
+        rows = [] if rule is None else rule.rows
+        if callable(rows):
+            rows = rows(text)
+        if isinstance(rows, Exception):
+            raise rows
+        self._rows = list(rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Connection handing out FakeCursors; connect() of the fake drivers returns one."""
+
+    def __init__(self, rules, latency, tracker):
+        self.rules = rules
+        self.latency = latency
+        self.tracker = tracker
+        self.autocommit = False
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.rules, self.latency, self.tracker)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeHost:
+    """Fixture tree standing in for the host: proc/, home/, root/, etc/, systemd unit directories and bin/.
+
+    Scenarios add processes, homes and units; installed() redirects the
+    cis_core probes to the tree while a checker runs.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.proc = self._dir('proc')
+        self.unit_dirs = tuple(self._dir(unit_dir.lstrip('/')) for unit_dir in hostprobe.SYSTEMD_UNIT_DIRS)
+        self.home_root = self._dir('home')
+        self.root_home = self._dir('root')
+        self.bin = self._dir('bin')
+        self.environment = self._file('etc/environment', "PATH=/usr/local/bin:/usr/bin:/bin\n")
+        self.crypto_policy = self._file('etc/crypto-policies/config', "DEFAULT\n")
+        self._file('proc/sys/crypto/fips_enabled', "0\n")
+        self.mountinfo = self._file('proc/self/mountinfo', "22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n")
+        self.next_pid = 1000
+
+    def _dir(self, relative):
+        path = os.path.join(self.root, relative)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _file(self, relative, content=''):
+        path = os.path.join(self.root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def add_process(self, comm, environ=()):
+        """A running process: proc/<pid>/comm and proc/<pid>/environ ('NAME=value' entries)."""
+        pid = self.next_pid
+        self.next_pid += 1
+        self._file(f'proc/{pid}/comm', comm + "\n")
+        self._file(f'proc/{pid}/environ', ''.join(entry + '\0' for entry in environ))
+        return pid
+
+    def add_home(self, user, files=None):
+        """A home directory with the given {name: content} files ('->target' makes a symlink)."""
+        home = self._dir(f'home/{user}')
+        for name, content in (files or {}).items():
+            path = os.path.join(home, name)
+            if content.startswith('->'):
+                os.symlink(content[2:], path)
+            else:
+                self._file(f'home/{user}/{name}', content)
+        return home
+
+    def add_unit(self, unit, enabled=True):
+        """A unit file in the vendor unit directory, linked into multi-user.target.wants when enabled."""
+        vendor_dir = self.unit_dirs[hostprobe.SYSTEMD_UNIT_DIRS.index('/usr/lib/systemd/system')]
+        unit_file = os.path.join(vendor_dir, unit)
+        with open(unit_file, 'w', encoding='utf-8') as f:
+            f.write("[Unit]\nDescription=bench\n[Install]\nWantedBy=multi-user.target\n")
+        if enabled:
+            wants = os.path.join(self.unit_dirs[0], 'multi-user.target.wants')
+            os.makedirs(wants, exist_ok=True)
+            os.symlink(unit_file, os.path.join(wants, unit))
+
+    @contextmanager
+    def installed(self):
+        patches = [
+            (hostprobe, 'systemd_unit_state', partial(hostprobe.systemd_unit_state, unit_dirs=self.unit_dirs)),
+            (hostprobe, 'systemd_unit_paths', partial(hostprobe.systemd_unit_paths, unit_dirs=self.unit_dirs)),
+            (hostprobe, 'fips_enabled', partial(hostprobe.fips_enabled, proc_root=self.proc)),
+            (hostprobe, 'crypto_policy', partial(hostprobe.crypto_policy, path=self.crypto_policy)),
+            (hostprobe, 'find_processes', partial(hostprobe.find_processes, proc_root=self.proc)),
+            (hostprobe, 'mount_info', partial(hostprobe.mount_info, mountinfo=self.mountinfo)),
+            (hostprobe, 'which', lambda binary, extra_dirs=(): hostprobe.shutil.which(binary, path=self.bin)),
+            (procscan, 'scan_process_environ', partial(procscan.scan_process_environ, proc_root=self.proc)),
+            (homescan, 'scan_home_directories',
+             partial(homescan.scan_home_directories, home_roots=(self.home_root,), extra_homes=(self.root_home,),
+                     extra_files=(self.environment,))),
+        ]
+        saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        for module, name, replacement in patches:
+            setattr(module, name, replacement)
+        try:
+            yield self
+        finally:
+            for module, name, original in saved:
+                setattr(module, name, original)
+
+
+class FakeShell:
+    """Stand-in for subprocess.run answering commands from ShellRules.
+
+    Commands no rule matches fail like a missing binary (exit code 127).
+    """
+
+    def __init__(self, rules, latency, tracker):
+        self.rules = rules
+        self.latency = latency
+        self.tracker = tracker
+
+    def __call__(self, args, check=False, **kwargs):
+        self.tracker.count('proc')
+        command = args if isinstance(args, str) else ' '.join(str(arg) for arg in args)
+        rule = next((rule for rule in self.rules if rule.pattern.search(command)), None)
+        time.sleep(self.latency if rule is None or rule.latency is None else rule.latency)
+        if rule is None:
+            stdout, returncode, stderr = '', 127, f"{command.split()[0]}: command not found"
+        else:
+            stdout = rule.stdout(command) if callable(rule.stdout) else rule.stdout
+            returncode, stderr = rule.returncode, ''
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args, output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+
+def fake_module(name, **attributes):
+    """Module object for sys.modules, e.g. a fake 'psycopg' with connect()."""
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def error_classes(*names):
+    """Driver exception classes (e.g. OperationalError) deriving from one base Error."""
+    base = type('Error', (Exception,), {})
+    return dict({name: type(name, (base,), {}) for name in names}, Error=base)
+
+
+@contextmanager
+def _patched(workdir, argv, modules, shell):
+    saved_modules = {name: sys.modules.get(name) for name in modules}
+    saved = (os.getcwd(), sys.argv, subprocess.run)
+    sys.modules.update(modules)
+    unload_drivers()  # the checker loads this run's fake driver on connect
+    subprocess.run = shell
+    os.chdir(workdir)
+    sys.argv = list(argv)
+    try:
+        yield
+    finally:
+        os.chdir(saved[0])
+        sys.argv = saved[1]
+        subprocess.run = saved[2]
+        unload_drivers()
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def run_script(name, script, workdir, modules, shell, tracker, host, args=()):
+    """Runs a checker script as __main__ in workdir with the fakes installed.
+
+    Returns a BenchResult. Console output of the script is discarded; its
+    report file is left in workdir.
+    """
+    script = os.path.abspath(script)
+    with tracker.installed(), host.installed(), _patched(workdir, [script, *args], modules, shell):
+        start = time.perf_counter()
+        try:
+            with redirect_stdout(io.StringIO()):
+                namespace = runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            raise RuntimeError(f"{os.path.basename(script)} exited with status {e.code}")
+        total = time.perf_counter() - start
+    sink = namespace['SINK']
+    sink.close()
+
+    checks = {}
+    for result in sink.results:
+        if result.check_id is None:
+            continue
+        entry = checks.setdefault(result.check_id, {'ms': 0.0, 'sql': 0, 'proc': 0})
+        entry['ms'] += result.duration * 1000
+    for check_id, counts in tracker.counts.items():
+        entry = checks.setdefault(check_id, {'ms': 0.0, 'sql': 0, 'proc': 0})
+        entry['sql'] += counts['sql']
+        entry['proc'] += counts['proc']
+    for entry in checks.values():
+        entry['ms'] = round(entry['ms'], 2)
+    return BenchResult(name, total, tracker.total('sql'), tracker.total('proc'), checks)
+
+
+def best_of(results):
+    """Combines repeated runs of one checker: fastest time per check and in total."""
+    best = min(results, key=lambda result: result.total)
+    checks = {}
+    for result in results:
+        for check_id, entry in result.checks.items():
+            if check_id not in checks or entry['ms'] < checks[check_id]['ms']:
+                checks[check_id] = dict(entry)
+    return best._replace(checks=checks)
+
+
+def to_baseline(results):
+    return {result.name: {
+        'total_ms': round(result.total * 1000, 2),
+        'round_trips': result.round_trips,
+        'subprocesses': result.subprocesses,
+        'checks': result.checks,
+    } for result in results}
+
+
+def save_baseline(path, results, keep=None):
+    """Writes the results as baseline; entries in keep for other checkers are preserved."""
+    baseline = dict(keep or {}, **to_baseline(results))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _sort_key(check_id):
+    return [int(part) if part.isdigit() else -1 for part in check_id.strip('()').split('.')]
+
+
+def compare(result, baseline, tolerance, min_ms):
+    """Regressions of one checker against its baseline entry, as report lines.
+
+    Times regress when they grow by more than tolerance (a fraction) and more
+    than min_ms; round trips and subprocesses are deterministic, so any
+    increase is a regression.
+    """
+    regressions = []
+
+    def slower(now, before):
+        return now > before * (1 + tolerance) and now - before > min_ms
+
+    total_ms = result.total * 1000
+    if slower(total_ms, baseline['total_ms']):
+        regressions.append(f"total time {baseline['total_ms']:.1f} -> {total_ms:.1f} ms")
+    for key in ('round_trips', 'subprocesses'):
+        if getattr(result, key) > baseline[key]:
+            regressions.append(f"{key.replace('_', ' ')} {baseline[key]} -> {getattr(result, key)}")
+    for check_id in sorted(result.checks, key=_sort_key):
+        entry = result.checks[check_id]
+        before = baseline['checks'].get(check_id)
+        if before is None:
+            continue  # new check, nothing to compare with
+        if slower(entry['ms'], before['ms']):
+            regressions.append(f"[{check_id}] time {before['ms']:.1f} -> {entry['ms']:.1f} ms")
+        if entry['sql'] > before['sql']:
+            regressions.append(f"[{check_id}] round trips {before['sql']} -> {entry['sql']}")
+        if entry['proc'] > before['proc']:
+            regressions.append(f"[{check_id}] subprocesses {before['proc']} -> {entry['proc']}")
+    return regressions
+
+
+def format_result(result, baseline=None):
+    """Per-check table and totals of one checker, with baseline values when given."""
+    lines = [f"== {result.name} =="]
+    header = f"  {'check':<10} {'ms':>9} {'sql':>5} {'proc':>5}"
+    if baseline:
+        header += f"   {'base ms':>9} {'sql':>5} {'proc':>5}"
+    lines.append(header)
+    for check_id in sorted(result.checks, key=_sort_key):
+        entry = result.checks[check_id]
+        line = f"  {check_id:<10} {entry['ms']:>9.2f} {entry['sql']:>5} {entry['proc']:>5}"
+        before = baseline['checks'].get(check_id) if baseline else None
+        if before:
+            line += f"   {before['ms']:>9.2f} {before['sql']:>5} {before['proc']:>5}"
+        lines.append(line)
+    total = f"  {'total':<10} {result.total * 1000:>9.2f} {result.round_trips:>5} {result.subprocesses:>5}"
+    if baseline:
+        total += f"   {baseline['total_ms']:>9.2f} {baseline['round_trips']:>5} {baseline['subprocesses']:>5}"
+    lines.append(total)
+    return lines
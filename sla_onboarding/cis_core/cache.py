@@ -0,0 +1,192 @@
+"""Fingerprinted result cache shared by the CIS checkers.
+
+A check may declare its inputs as (kind, key) pairs, e.g. ('guc', 'ssl'),
+('path', '/var/lib/pgsql/17/data') or ('package', 'pgbackrest'). Before a run
+every declared input is resolved in one batch per kind and hashed into a
+fingerprint per check. When the stored fingerprint for a check matches, its
+captured output is replayed from a local SQLite store instead of running the
+check again. Checks without declared inputs always run.
+
+Paths, globs and file contents are resolved on homescan's bounded daemon
+pool, so a hung mount (a glob under /home on a dead NFS server) costs at most
+the input timeout instead of blocking the run before any check starts. An
+input that timed out or could not be resolved is UNRESOLVED, and a check with
+an unresolved input gets no fingerprint: it runs, and its result is neither
+served from nor stored in the cache.
+"""
+import datetime
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+from functools import partial
+
+from cis_core.homescan import DEFAULT_DIR_TIMEOUT, run_bounded
+from cis_core.sink import CheckResult
+
+DEFAULT_INPUT_TIMEOUT = DEFAULT_DIR_TIMEOUT  # seconds to resolve one path, glob or file; <= 0 waits forever
+UNRESOLVED = object()                        # value of an input that timed out or failed to resolve
+
+
+def _stat_signature(path):
+    """Identity of a path for fingerprinting: inode, mtime, size, mode and owner."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return "missing"
+    except OSError as e:
+        return f"error:{e.errno}"
+    signature = f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}:{st.st_mode:o}:{st.st_uid}:{st.st_gid}"
+    if os.path.islink(path):
+        try:
+            signature += f"->{os.readlink(path)}"
+        except OSError:
+            pass
+    return signature
+
+
+def _resolve_bounded(func, keys, timeout):
+    """{key: func(key)} resolved on the bounded pool; UNRESOLVED for keys that timed out or raised."""
+    return {key: value if state == 'ok' else UNRESOLVED
+            for key, (state, value) in run_bounded(func, keys, timeout=timeout).items()}
+
+
+def _glob_signature(pattern):
+    return [(path, _stat_signature(path)) for path in sorted(glob.glob(pattern))]
+
+
+def _content_signature(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError as e:
+        return f"error:{e.errno}"
+
+
+def resolve_paths(keys, timeout=DEFAULT_INPUT_TIMEOUT):
+    return _resolve_bounded(_stat_signature, keys, timeout)
+
+
+def resolve_globs(keys, timeout=DEFAULT_INPUT_TIMEOUT):
+    """Every match of a glob pattern with its stat signature (new or removed matches change it)."""
+    return _resolve_bounded(_glob_signature, keys, timeout)
+
+
+def resolve_contents(keys, timeout=DEFAULT_INPUT_TIMEOUT):
+    """Contents of small files such as /proc/sys/crypto/fips_enabled."""
+    return _resolve_bounded(_content_signature, keys, timeout)
+
+
+def resolve_packages(keys):
+    """Installed package versions, from one rpm or dpkg-query call for all packages."""
+    keys = list(keys)
+    values = dict.fromkeys(keys, "unknown")
+    for command in (['rpm', '-q', '--qf', '%{NAME} %{VERSION}-%{RELEASE}\n'],
+                    ['dpkg-query', '-W', '-f', '${Package} ${Version}\n']):
+        try:
+            result = subprocess.run(command + keys, capture_output=True, text=True, errors='ignore')
+        except OSError:
+            continue  # package manager not present
+        found = False
+        for line in result.stdout.splitlines():
+            name, _, version = line.partition(' ')
+            if name in values and version:
+                values[name] = version
+                found = True
+        if found:
+            break
+    return values
+
+
+def default_resolvers(timeout=DEFAULT_INPUT_TIMEOUT):
+    """Resolvers of the built-in input kinds, the filesystem ones bounded by timeout seconds per input."""
+    return {
+        'path': partial(resolve_paths, timeout=timeout),
+        'glob': partial(resolve_globs, timeout=timeout),
+        'content': partial(resolve_contents, timeout=timeout),
+        'package': resolve_packages,
+    }
+
+
+class ResultCache:
+    """SQLite store of check outputs keyed by (scope, check id) and fingerprint.
+
+    scope separates the instances audited from one host (e.g. host:port/dbname);
+    salt is mixed into every fingerprint (e.g. the checker version), so changing
+    it invalidates all entries. With full=True nothing is served from the cache
+    but fresh results are still stored. input_timeout bounds the resolution of
+    each path, glob and file input.
+    """
+
+    def __init__(self, path, scope, salt='', resolvers=None, full=False, input_timeout=DEFAULT_INPUT_TIMEOUT):
+        self.path = path
+        self.scope = scope
+        self.salt = salt
+        self.resolvers = dict(default_resolvers(input_timeout), **(resolvers or {}))
+        self.full = full
+        self.hits = []
+        self._db = sqlite3.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS check_results (
+                scope TEXT NOT NULL,
+                check_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                buffer TEXT NOT NULL,
+                stored_at TEXT NOT NULL,
+                PRIMARY KEY (scope, check_id)
+            )""")
+
+    def fingerprints(self, inputs_by_check):
+        """Resolves {check_id: [(kind, key), ...]} into {check_id: fingerprint}.
+
+        Inputs of all checks are resolved in one batch per kind. Checks with an
+        input kind that has no resolver, or an UNRESOLVED input, get no
+        fingerprint (they always run).
+        """
+        wanted = {}
+        for inputs in inputs_by_check.values():
+            for kind, key in inputs:
+                wanted.setdefault(kind, set()).add(key)
+        resolved = {kind: self.resolvers[kind](sorted(keys))
+                    for kind, keys in wanted.items() if kind in self.resolvers}
+
+        prints = {}
+        for check_id, inputs in inputs_by_check.items():
+            if not inputs or any(kind not in resolved for kind, _ in inputs):
+                continue
+            values = [(kind, key, resolved[kind].get(key)) for kind, key in sorted(inputs)]
+            if any(value is UNRESOLVED for _, _, value in values):
+                continue
+            payload = json.dumps([self.salt, values], default=str)
+            prints[check_id] = hashlib.sha256(payload.encode()).hexdigest()
+        return prints
+
+    def lookup(self, check_id, fingerprint):
+        """Returns (buffer, stored_at) when the stored fingerprint matches, else None."""
+        if self.full:
+            return None
+        row = self._db.execute(
+            "SELECT fingerprint, buffer, stored_at FROM check_results WHERE scope = ? AND check_id = ?",
+            (self.scope, check_id)).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        buffer = []
+        for kind, entry in json.loads(row[1]):
+            if kind == 'result':
+                # Nothing was spent on it in this run
+                entry = CheckResult(*entry)._replace(duration=0.0)
+            buffer.append((kind, entry))
+        self.hits.append(check_id)
+        return buffer, row[2]
+
+    def store(self, check_id, fingerprint, buffer):
+        stored_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._db.execute(
+            "INSERT OR REPLACE INTO check_results (scope, check_id, fingerprint, buffer, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (self.scope, check_id, fingerprint, json.dumps(buffer, default=str), stored_at))
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,196 @@
+"""All-databases sweep for the database-scoped CIS checks.
+
+Some checks (SECURITY DEFINER functions, installed extensions) look at
+per-database catalogs, so a single connection to the configured dbname only
+covers one database of the cluster. Given the connectable databases (listed
+once with SQL_DATABASES), a DatabaseSweep runs every database-scoped query of
+the run on each of them: one connection per database serves all its queries,
+connections come from a bounded ConnectionPool and databases are swept
+concurrently on daemon threads while the other checks run. The checks then
+read the rows of their query per database.
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from cis_core.homescan import run_bounded
+
+DEFAULT_MAX_CONNECTIONS = 4
+
+SQL_DATABASES = """
+    SELECT datname FROM pg_database
+    WHERE datallowconn AND NOT datistemplate
+    ORDER BY datname;
+"""
+
+
+class ConnectionPool:
+    """At most max_size open connections, kept idle per database name and reused.
+
+    connect(dbname) opens a new connection. When the pool is full, the least
+    recently used idle connection (to another database) is closed to make room;
+    if none is idle, callers wait for a connection to be released.
+    """
+
+    def __init__(self, connect, max_size=DEFAULT_MAX_CONNECTIONS):
+        self.connect = connect
+        self.max_size = max(1, max_size)
+        self.opened = 0           # connections opened over the pool's lifetime
+        self._open = 0
+        self._idle = OrderedDict()  # dbname -> [connection], least recently used first
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def connection(self, dbname):
+        """Context manager lending a connection to dbname; it goes back to the pool afterwards."""
+        conn = self._acquire(dbname)
+        try:
+            yield conn
+        except BaseException:
+            self._discard(conn)  # state unknown, e.g. the server went away mid-query
+            raise
+        self._release(dbname, conn)
+
+    def _acquire(self, dbname):
+        evicted = None
+        with self._cond:
+            while True:
+                if self._idle.get(dbname):
+                    return self._idle[dbname].pop()
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                victim = next((name for name, conns in self._idle.items() if conns), None)
+                if victim is not None:
+                    evicted = self._idle[victim].pop(0)  # its slot is taken over below
+                    break
+                self._cond.wait()
+        if evicted is not None:
+            _close(evicted)
+        try:
+            conn = self.connect(dbname)
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.opened += 1
+        return conn
+
+    def _release(self, dbname, conn):
+        with self._cond:
+            self._idle.setdefault(dbname, []).append(conn)
+            self._idle.move_to_end(dbname)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        _close(conn)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Closes the idle connections."""
+        with self._cond:
+            conns = [conn for pooled in self._idle.values() for conn in pooled]
+            self._open -= len(conns)
+            self._idle.clear()
+        for conn in conns:
+            _close(conn)
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def run_query(driver, cursor, query, dbname=None):
+    """Result of one query, or an 'SQL_INFO:' / 'SQL_ERROR:' string like primitives.execute_sql.
+
+    query is SQL (the rows are returned) or a callable query(cursor, dbname)
+    that runs its own statements on a streaming cursor and returns anything.
+    """
+    try:
+        if callable(query):
+            return query(cursor, dbname)
+        cursor.execute(query)
+        return cursor.fetchall()
+    except driver.sql_errors as err:
+        if driver.is_timeout(err):
+            return f"SQL_ERROR: Statement timeout - {err}"
+        if isinstance(err, driver.missing_errors):
+            return f"SQL_INFO: Feature/Object missing - {err}"
+        return f"SQL_ERROR: {err}"
+
+
+class DatabaseSweep:
+    """Runs named queries (see run_query) on every database; results(name) returns them per database.
+
+    start() sweeps in the background; results() waits for the sweep to finish.
+    """
+
+    def __init__(self, pool, driver, queries, databases):
+        self.pool = pool
+        self.driver = driver
+        self.queries = dict(queries)   # {name: SQL or callable}
+        self.databases = list(databases)
+        self._results = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def _sweep_database(self, dbname):
+        """All queries on one pooled connection; a connection failure is reported for every query."""
+        try:
+            with self.pool.connection(dbname) as conn:
+                cursor = conn.cursor()
+                try:
+                    return {name: self._run(conn, cursor, query, dbname) for name, query in self.queries.items()}
+                finally:
+                    cursor.close()
+        except self.driver.sql_errors as err:
+            return dict.fromkeys(self.queries, f"SQL_ERROR: Could not connect to database {dbname}: {err}")
+
+    def _run(self, conn, cursor, query, dbname):
+        if not callable(query):
+            return run_query(self.driver, cursor, query, dbname)
+        stream = self.driver.stream_cursor(conn)  # one per callable: named cursors are single-use
+        try:
+            return run_query(self.driver, stream, query, dbname)
+        finally:
+            stream.close()
+
+    def _sweep(self):
+        try:
+            # Daemon workers (see homescan.run_bounded); queries are bounded by the session's statement timeout
+            outcomes = run_bounded(self._sweep_database, self.databases, self.pool.max_size, timeout=None)
+            for dbname, (outcome, value) in outcomes.items():
+                self._results[dbname] = value if outcome == 'ok' else dict.fromkeys(
+                    self.queries, f"SQL_ERROR: Unexpected {value}")
+        finally:
+            self.pool.close()
+            self._done.set()
+
+    def start(self):
+        """Starts sweeping on a daemon thread (so a hung server cannot keep the process alive)."""
+        self._thread = threading.Thread(target=self._sweep, name='db-sweep', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """True once every database has been swept."""
+        if self._thread is None:
+            self._sweep()
+        return self._done.wait(timeout)
+
+    def results(self, name, timeout=None):
+        """{dbname: result or 'SQL_...' string} for one query, in database name order.
+
+        Databases not swept within timeout seconds are reported as timed out.
+        """
+        self.wait(timeout)
+        return {dbname: self._results[dbname][name] if dbname in self._results
+                else "SQL_ERROR: Statement timeout - database not swept in time"
+                for dbname in self.databases}
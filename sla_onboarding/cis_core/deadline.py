@@ -0,0 +1,166 @@
+"""Run deadline and per-check time budgets shared by the CIS checkers.
+
+A TimeBudget attached to the ResultSink (sink.budget) gives every check a
+deadline when it begins: its own budget (default or per-check override),
+capped by the deadline of the whole run. Shell commands get the time left as
+their subprocess timeout, SQL statements are bounded server-side with the
+statement timeout the checkers keep on their session (see SessionTimeout),
+and once a check has hit a timeout, or runs past its deadline, its remaining
+results are recorded as TIMEOUT. The scheduler
+stops waiting for OS-side checks that overrun and reports them as TIMEOUT
+while the other checks carry on.
+"""
+import threading
+import time
+from collections import defaultdict
+
+TIMEOUT = 'TIMEOUT'
+DEFAULT_RUN_DEADLINE = 1800.0   # seconds for the whole run
+DEFAULT_CHECK_BUDGET = 120.0    # seconds per check
+STATEMENT_TIMEOUT_SLACK = 1.0   # seconds the session's statement timeout may differ from a check's before it is re-issued
+
+# Upper bounds (seconds) of the duration histogram buckets; the last one is open
+HISTOGRAM_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0)
+HISTOGRAM_WIDTH = 40            # characters of the longest bar
+SLOWEST_CHECKS = 5
+
+
+def _limit(seconds):
+    """None (no limit) for missing, zero or negative values."""
+    return seconds if seconds and seconds > 0 else None
+
+
+class TimeBudget:
+    """Deadline of a run and time budget of each check, in time.monotonic() seconds."""
+
+    def __init__(self, run_seconds=DEFAULT_RUN_DEADLINE, check_seconds=DEFAULT_CHECK_BUDGET, overrides=None):
+        self.started = time.monotonic()
+        self.run_seconds = _limit(run_seconds)
+        self.run_deadline = self.started + self.run_seconds if self.run_seconds else None
+        self.check_seconds = _limit(check_seconds)
+        self.overrides = {check_id: _limit(seconds) for check_id, seconds in (overrides or {}).items()}
+
+    @classmethod
+    def from_config(cls, config, run_seconds=None):
+        """Reads the optional [checks] run_deadline / check_timeout keys and the [check_timeouts] section.
+
+        run_seconds (e.g. from --deadline) takes precedence over run_deadline.
+        """
+        if run_seconds is None:
+            run_seconds = config.getfloat('checks', 'run_deadline', fallback=DEFAULT_RUN_DEADLINE)
+        check_seconds = config.getfloat('checks', 'check_timeout', fallback=DEFAULT_CHECK_BUDGET)
+        overrides = {}
+        if config.has_section('check_timeouts'):
+            overrides = {check_id: config.getfloat('check_timeouts', check_id)
+                         for check_id in config.options('check_timeouts')}
+        return cls(run_seconds, check_seconds, overrides)
+
+    def budget_for(self, check_id):
+        """Seconds a check may take, or None if unlimited."""
+        return self.overrides.get(check_id, self.check_seconds)
+
+    def deadline_for(self, check_id, started=None):
+        """Deadline of a check that started at started (default now), capped by the run deadline."""
+        budget = self.budget_for(check_id)
+        deadline = (started if started is not None else time.monotonic()) + budget if budget else None
+        if self.run_deadline is None:
+            return deadline
+        return self.run_deadline if deadline is None else min(deadline, self.run_deadline)
+
+    def run_remaining(self):
+        """Seconds left until the run deadline, or None without one."""
+        if self.run_deadline is None:
+            return None
+        return self.run_deadline - time.monotonic()
+
+    def run_expired(self):
+        return self.run_deadline is not None and time.monotonic() >= self.run_deadline
+
+    def statement_timeout(self, check_id=None):
+        """Seconds a single SQL statement of a check may run: its budget (the default
+        budget without check_id), capped by the run time left.
+
+        Returns None when unlimited.
+        """
+        timeout = self.budget_for(check_id) if check_id is not None else self.check_seconds
+        remaining = self.run_remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return None if timeout is None else max(timeout, 1.0)
+
+
+class SessionTimeout:
+    """Keeps a session's server-side statement timeout in line with the running check.
+
+    The checkers set the default check budget on their session when they
+    connect. Before a check's statements, before_statement() re-issues it
+    through apply(seconds) (0 for no limit, returning True once set) only
+    when the check's own budget differs from the session's value by more than
+    STATEMENT_TIMEOUT_SLACK, i.e. for a [check_timeouts] override or with the
+    run deadline closing in; checks on the default budget, and checks without
+    SQL, cost no extra round trip. Only the thread that owns the connection
+    adjusts it, and a session that refuses the setting is left alone.
+    """
+
+    def __init__(self, budget, apply, current):
+        self.budget = budget
+        self.apply = apply
+        self.current = current  # seconds set on the session, None for no limit
+        self.check_id = None
+        self.owner = threading.current_thread()
+
+    def begin_check(self, check_id):
+        if threading.current_thread() is self.owner:
+            self.check_id = check_id
+
+    def before_statement(self):
+        """Re-issues the statement timeout if the current check needs a different one."""
+        if self.apply is None or threading.current_thread() is not self.owner:
+            return
+        wanted = self.budget.statement_timeout(self.check_id)
+        if wanted == self.current:
+            return
+        if wanted is not None and self.current is not None and abs(wanted - self.current) <= STATEMENT_TIMEOUT_SLACK:
+            return
+        if self.apply(wanted or 0):
+            self.current = wanted
+        else:
+            self.apply = None
+
+
+def check_durations(results):
+    """Total seconds per check id (a check's results each carry the time since the previous one)."""
+    durations = defaultdict(float)
+    for result in results:
+        if result.check_id is not None:
+            durations[result.check_id] += result.duration
+    return dict(durations)
+
+
+def _bucket_label(low, high):
+    def fmt(seconds):
+        return f"{seconds * 1000:g}ms" if seconds < 1 else f"{seconds:g}s"
+    if high is None:
+        return f">= {fmt(low)}"
+    return f"{fmt(low)} - {fmt(high)}" if low else f"< {fmt(high)}"
+
+
+def duration_histogram(results):
+    """Report lines: how many checks took how long, and the slowest checks."""
+    durations = check_durations(results)
+    if not durations:
+        return []
+    bounds = list(HISTOGRAM_BUCKETS) + [None]
+    counts = [0] * len(bounds)
+    for seconds in durations.values():
+        counts[next(i for i, high in enumerate(bounds) if high is None or seconds < high)] += 1
+    labels = [_bucket_label(bounds[i - 1] if i else 0, high) for i, high in enumerate(bounds)]
+    label_width = max(len(label) for label in labels)
+    scale = max(counts)
+    lines = [f"Check duration histogram ({len(durations)} checks, {sum(durations.values()):.2f}s in total):"]
+    for label, count in zip(labels, counts):
+        bar = '#' * (round(count * HISTOGRAM_WIDTH / scale) if count else 0)
+        lines.append(f"  {label:>{label_width}} | {count:4d} {bar}")
+    slowest = sorted(durations.items(), key=lambda item: item[1], reverse=True)[:SLOWEST_CHECKS]
+    lines.append("  Slowest: " + ", ".join(f"{check_id} ({seconds:.2f}s)" for check_id, seconds in slowest))
+    return lines
@@ -0,0 +1,111 @@
+"""Database drivers for the CIS checkers, imported on first connect.
+
+Importing psycopg or mysql.connector takes longer than the rest of a checker's
+startup and is wasted for --help or a run without a database, so the checkers
+only load their driver right before connecting. Each loader returns a Driver
+(cached after the first call) or raises ImportError with installation hints.
+"""
+
+
+class Driver:
+    """A loaded DB driver: connect(), its exception classes and how to classify them.
+
+    Error classes are also attributes, e.g. driver.OperationalError.
+    """
+
+    def __init__(self, name, module, errors, missing=(), stream_cursor=None, timeouts=(), timeout_codes=()):
+        self.name = name          # e.g. 'psycopg', 'psycopg2', 'mysql.connector', 'pymysql'
+        self.module = module
+        # stream_cursor(conn) opens a cursor that fetches rows as they are read instead of buffering the whole result
+        self._stream_cursor = stream_cursor
+        self.errors = errors      # {class name: exception class}
+        # Caught by execute_sql; missing_errors are reported as SQL_INFO instead of SQL_ERROR
+        self.sql_errors = tuple(errors.values())
+        self.missing_errors = tuple(errors[name] for name in missing)
+        # A statement cancelled by the server-side statement timeout: by class, or by server error number
+        self.timeout_errors = tuple(errors[name] for name in timeouts)
+        self.timeout_codes = tuple(timeout_codes)
+        for error_name, error_class in errors.items():
+            setattr(self, error_name, error_class)
+
+    def connect(self, **params):
+        return self.module.connect(**params)
+
+    def is_timeout(self, err):
+        """True if err is a statement cancelled by the server-side statement timeout."""
+        if isinstance(err, self.timeout_errors):
+            return True
+        code = getattr(err, 'errno', None)
+        if code is None and err.args and isinstance(err.args[0], int):
+            code = err.args[0]  # PyMySQL: (errno, message)
+        return code in self.timeout_codes
+
+    def stream_cursor(self, conn):
+        if self._stream_cursor is None:
+            return conn.cursor()
+        return self._stream_cursor(conn)
+
+
+PG_ERROR_NAMES = ('OperationalError', 'InsufficientPrivilege', 'UndefinedTable', 'UndefinedColumn',
+                  'UndefinedObject', 'UndefinedParameter', 'QueryCanceled')
+PG_MISSING_ERROR_NAMES = ('UndefinedParameter', 'UndefinedObject', 'UndefinedTable', 'UndefinedColumn')
+PG_TIMEOUT_ERROR_NAMES = ('QueryCanceled',)  # SQLSTATE 57014, raised when statement_timeout expires
+# ER_QUERY_TIMEOUT (MySQL max_execution_time), ER_STATEMENT_TIMEOUT (MariaDB max_statement_time)
+MYSQL_TIMEOUT_CODES = (3024, 1969)
+
+_loaded = {}
+
+
+def _pg_server_cursor(conn):
+    """Named (server-side) cursor; WITH HOLD, so it can also be declared on an autocommit connection."""
+    return conn.cursor(name='cis_stream', withhold=True)
+
+
+def load_postgres_driver():
+    """psycopg 3 (recommended) or psycopg2."""
+    if 'postgres' not in _loaded:
+        try:
+            import psycopg
+            from psycopg import errors
+            _loaded['postgres'] = Driver('psycopg', psycopg, {name: getattr(errors, name) for name in PG_ERROR_NAMES},
+                                         PG_MISSING_ERROR_NAMES, stream_cursor=_pg_server_cursor,
+                                         timeouts=PG_TIMEOUT_ERROR_NAMES)
+        except ImportError:
+            try:
+                import psycopg2
+                from psycopg2 import errors
+            except ImportError:
+                raise ImportError("The 'psycopg' (recommended) or 'psycopg2' library is required. "
+                                  "Please install it using: pip install \"psycopg[binary]\" OR pip install psycopg2") from None
+            classes = {name: getattr(errors, name, None) for name in PG_ERROR_NAMES}
+            classes['OperationalError'] = psycopg2.OperationalError
+            classes['UndefinedParameter'] = errors.lookup('42P02') # Undefined parameter may not have a specific class
+            _loaded['postgres'] = Driver('psycopg2', psycopg2, classes, PG_MISSING_ERROR_NAMES,
+                                         stream_cursor=_pg_server_cursor, timeouts=PG_TIMEOUT_ERROR_NAMES)
+    return _loaded['postgres']
+
+
+def load_mysql_driver():
+    """mysql-connector-python (works with MariaDB too) or PyMySQL."""
+    if 'mysql' not in _loaded:
+        try:
+            import mysql.connector
+            _loaded['mysql'] = Driver('mysql.connector', mysql.connector, {'Error': mysql.connector.Error},
+                                      stream_cursor=lambda conn: conn.cursor(buffered=False),
+                                      timeout_codes=MYSQL_TIMEOUT_CODES)
+        except ImportError:
+            try:
+                import pymysql
+            except ImportError:
+                raise ImportError("A MySQL/MariaDB Python library is required. "
+                                  "Please install one of: pip install mysql-connector-python OR pip install PyMySQL") from None
+            import pymysql.cursors
+            _loaded['mysql'] = Driver('pymysql', pymysql, {'Error': pymysql.Error},
+                                      stream_cursor=lambda conn: conn.cursor(pymysql.cursors.SSCursor),
+                                      timeout_codes=MYSQL_TIMEOUT_CODES)
+    return _loaded['mysql']
+
+
+def unload_drivers():
+    """Forgets the loaded drivers, so the next load imports them again (used by the benchmark's fake drivers)."""
+    _loaded.clear()
@@ -0,0 +1,117 @@
+"""Fleet mode shared by the CIS checkers: audit many database targets at once.
+
+The DB-side checks only need a handful of result sets (the settings snapshot
+and a few catalog queries). For every target those are fetched concurrently
+over async connections, bounded by a semaphore and a per-target timeout. The
+unchanged synchronous checks then run against a ReplayCursor serving the
+prefetched rows, each target gets its own report file, and one merged summary
+lists all of them.
+"""
+import re
+import time
+from collections import namedtuple
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_TIMEOUT = 60  # seconds per target (connect + all queries)
+
+Target = namedtuple('Target', ['name', 'params'])  # params: driver connect() keyword arguments
+TargetResult = namedtuple('TargetResult', [
+    'target',
+    'state',    # OK, TIMEOUT or ERROR
+    'error',    # error message when state is not OK
+    'results',  # {normalized sql: rows or exception} when state is OK
+    'elapsed',  # seconds
+])
+
+
+def normalize_sql(sql):
+    """Collapses whitespace so a query is found whatever its indentation."""
+    return ' '.join(sql.split())
+
+
+class ReplayCursor:
+    """DB-API-like cursor answering execute() from prefetched result sets.
+
+    Queries that failed during the prefetch re-raise their original exception;
+    queries that were not prefetched raise whatever missing_error(sql) returns.
+    """
+
+    def __init__(self, results, missing_error=LookupError):
+        self.results = results
+        self.missing_error = missing_error
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        key = normalize_sql(sql)
+        if key not in self.results:
+            raise self.missing_error(sql)
+        rows = self.results[key]
+        if isinstance(rows, Exception):
+            raise rows
+        self._rows = list(rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+def load_target_list(path, base_params):
+    """Reads a target list file: one 'host[:port][/dbname] [name]' per line, '#' comments.
+
+    Credentials and anything not given on the line come from base_params.
+    """
+    targets = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            spec, _, name = line.partition(' ')
+            match = re.match(r'^([^:/]+)(?::(\d+))?(?:/(.+))?$', spec)
+            if not match:
+                raise ValueError(f"Invalid target '{spec}' in {path}")
+            host, port, dbname = match.groups()
+            params = dict(base_params, host=host)
+            if port:
+                params['port'] = port
+            if dbname:
+                params['dbname'] = dbname
+            targets.append(Target(name.strip() or spec, params))
+    return targets
+
+
+async def _fetch_target(target, fetch, queries, semaphore, timeout):
+    import asyncio
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            results = await asyncio.wait_for(fetch(target, queries), timeout)
+            return TargetResult(target, 'OK', None, results, time.monotonic() - start)
+        except asyncio.TimeoutError:
+            return TargetResult(target, 'TIMEOUT', f"No answer within {timeout}s", None, time.monotonic() - start)
+        except Exception as e:
+            return TargetResult(target, 'ERROR', str(e).strip(), None, time.monotonic() - start)
+
+
+def fetch_fleet(targets, fetch, queries, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """Runs fetch(target, queries) for every target with at most `concurrency` in flight.
+
+    fetch is a coroutine function returning {normalize_sql(sql): rows or exception}.
+    Returns a list of TargetResult in the order of targets.
+    """
+    # asyncio is only imported for fleet runs; it would double the checkers' startup time
+    import asyncio
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        return await asyncio.gather(*(_fetch_target(t, fetch, queries, semaphore, timeout) for t in targets))
+    return asyncio.run(run_all())
@@ -0,0 +1,137 @@
+"""Global variable and status snapshots shared by the MySQL and MariaDB checkers.
+
+Instead of one 'SHOW VARIABLES LIKE ...' per check (a scan of the variables
+table each time, with the name interpolated into SQL), all global variables
+are loaded with a single query and looked up by name, case-insensitively.
+The Galera checks do the same with the wsrep_% status counters, which can be
+sampled twice to derive rates.
+"""
+import time
+
+from cis_core.primitives import as_text
+
+
+class GlobalVariables:
+    """In-memory snapshot of the server's global variables, indexed by lower-case name."""
+
+    # performance_schema.global_variables is tried first; it is empty when
+    # performance_schema is disabled (the MariaDB default), so SHOW GLOBAL
+    # VARIABLES is the fallback.
+    QUERIES = (
+        "SELECT VARIABLE_NAME, VARIABLE_VALUE FROM performance_schema.global_variables;",
+        "SHOW GLOBAL VARIABLES;",
+    )
+
+    def __init__(self):
+        self.values = {}
+        self.loaded = False
+        self.source = None  # query the snapshot was loaded with
+        self.error = "SQL_ERROR: Global variables not loaded"
+
+    def load(self, execute_sql):
+        """(Re)loads the snapshot. execute_sql(sql) returns rows or an 'SQL_ERROR:' string.
+
+        Returns True on success; otherwise error holds the last failure.
+        """
+        self.values = {}
+        self.loaded = False
+        for sql in self.QUERIES:
+            rows = execute_sql(sql)
+            if isinstance(rows, str):
+                self.error = rows
+                continue
+            if not rows:
+                self.error = f"SQL_ERROR: No rows returned by '{sql}'"
+                continue
+            for name, value in rows:
+                self.values[name.lower()] = as_text(value)
+            self.loaded = True
+            self.source = sql
+            return True
+        return False
+
+    def show(self, name):
+        """Value of a variable as SHOW would print it, None if the server has no such variable
+        (or its value is NULL, see has()), or the 'SQL_ERROR:' string when the snapshot could not be loaded.
+        """
+        if not self.loaded:
+            return self.error
+        return self.values.get(name.lower())
+
+    def has(self, name):
+        """True if the server has the variable, whatever its value (e.g. secure_file_priv = NULL)."""
+        return name.lower() in self.values
+
+
+class WsrepStatus:
+    """Snapshot of a Galera node's wsrep_% status counters, loaded with one query.
+
+    Each sample() replaces the snapshot and keeps the previous one, so rates
+    over the interval between two samples come without extra queries.
+    """
+
+    QUERY = "SHOW GLOBAL STATUS WHERE Variable_name LIKE 'wsrep_%';"
+
+    def __init__(self):
+        self.values = {}
+        self.taken_at = None
+        self.previous = None
+        self.previous_at = None
+        self.error = "SQL_ERROR: wsrep status not loaded"
+
+    def sample(self, execute_sql):
+        """Takes a new snapshot. execute_sql(sql) returns rows or an 'SQL_ERROR:' string. Returns True on success."""
+        rows = execute_sql(self.QUERY)
+        if isinstance(rows, str):
+            self.error = rows
+            return False
+        if self.taken_at is not None:
+            self.previous, self.previous_at = self.values, self.taken_at
+        self.values = {name.lower(): as_text(value) for name, value in rows}
+        self.taken_at = time.monotonic()
+        return True
+
+    def show(self, name):
+        """Value of a status variable, or None if the node does not report it."""
+        return self.values.get(name.lower())
+
+    def is_galera(self):
+        """A node with a wsrep provider loaded reports a non-zero cluster size."""
+        return self.show('wsrep_cluster_size') not in (None, '', '0')
+
+    def interval(self):
+        """Seconds between the last two samples, or None before the second sample."""
+        if self.previous_at is None:
+            return None
+        return self.taken_at - self.previous_at
+
+    def delta(self, name):
+        """Change of a numeric counter between the last two samples, or None."""
+        if self.previous is None:
+            return None
+        try:
+            return float(self.values[name.lower()]) - float(self.previous[name.lower()])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def rates(self):
+        """Rates over the last sampling interval: {name: value}, empty before the second sample.
+
+        flow_control_paused: fraction of the interval replication was paused by flow control
+        recv_queue_growth: change of the receive queue length per second
+        flow_control_sent: pause messages this node sent per second
+        """
+        interval = self.interval()
+        if not interval:
+            return {}
+        rates = {}
+        paused_ns = self.delta('wsrep_flow_control_paused_ns')
+        if paused_ns is not None:
+            rates['flow_control_paused'] = min(1.0, max(0.0, paused_ns / (interval * 1e9)))
+        queue = self.delta('wsrep_local_recv_queue')
+        if queue is not None:
+            rates['recv_queue_growth'] = queue / interval
+        sent = self.delta('wsrep_flow_control_sent')
+        if sent is not None:
+            rates['flow_control_sent'] = sent / interval
+        return rates
@@ -0,0 +1,226 @@
+"""Single-pass home directory scanner shared by the CIS checkers.
+
+Replaces separate 'sudo find /home ... .psql_history' walks (one per file
+type and root) and 'sudo grep VAR <profile files>' calls: each home directory
+is listed once with os.scandir, its history files are classified (symlink or
+regular file) and its profile files are read and searched for all requested
+variables at the same time. Homes are scanned on a bounded pool of daemon
+threads; a directory that does not answer within the per-directory timeout
+(a hung NFS mount) is reported as timed out and its worker replaced, so one
+bad mount cannot stall the run. Directories and files the current user may
+not read go through the run's privileged helper.
+"""
+import os
+import re
+import stat
+import threading
+import time
+from collections import deque, namedtuple
+
+from cis_core.privhelper import require_helper
+
+HistoryFile = namedtuple('HistoryFile', ['path', 'kind', 'target'])   # kind: 'symlink', 'file' or 'other'
+SecretHit = namedtuple('SecretHit', ['path', 'line', 'variable'])
+HomeScanResult = namedtuple('HomeScanResult', ['homes', 'history', 'hits', 'errors', 'timed_out'])
+
+HOME_ROOTS = ('/home',)                      # every entry below these is a home directory
+EXTRA_HOMES = ('/root',)
+EXTRA_FILES = ('/etc/environment',)          # searched like profile files
+PROFILE_NAMES = ('.bashrc', '.bash_profile', '.bash_login', '.profile', '.zshrc', '.cshrc')
+HISTORY_NAMES = ('.psql_history',)
+DEFAULT_WORKERS = 8
+DEFAULT_DIR_TIMEOUT = 10.0                   # seconds; <= 0 waits forever
+
+
+def run_bounded(func, items, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_DIR_TIMEOUT):
+    """Runs func(item) for every item on at most max_workers daemon threads.
+
+    Returns {item: ('ok', value) | ('error', exception) | ('timeout', None)}.
+    An item still running after timeout seconds is given up on and a new worker
+    takes over the remaining items; the stuck thread is left behind (it is a
+    daemon thread, so it does not keep the process alive).
+    """
+    pending = deque(dict.fromkeys(items))
+    total = len(pending)
+    outcomes = {}
+    started = {}
+    done = threading.Condition()
+
+    def worker():
+        while True:
+            with done:
+                if not pending:
+                    return
+                item = pending.popleft()
+                started[item] = time.monotonic()
+            try:
+                outcome = ('ok', func(item))
+            except Exception as e:
+                outcome = ('error', e)
+            with done:
+                if started.pop(item, None) is not None:
+                    outcomes[item] = outcome
+                done.notify()
+
+    def spawn():
+        threading.Thread(target=worker, name='home-scan', daemon=True).start()
+
+    with done:
+        for _ in range(min(max(1, max_workers), total)):
+            spawn()
+        while len(outcomes) < total:
+            if timeout is None or timeout <= 0:
+                done.wait()
+                continue
+            now = time.monotonic()
+            for item in [i for i, t in started.items() if now - t >= timeout]:
+                del started[item]
+                outcomes[item] = ('timeout', None)
+                if pending:
+                    spawn()  # replaces the stuck worker
+            if len(outcomes) < total:
+                next_expiry = min(started.values(), default=now) + timeout
+                done.wait(max(0.01, next_expiry - now))
+    return outcomes
+
+
+def _secret_pattern(variables):
+    return re.compile(rb'\b(' + b'|'.join(re.escape(v.encode()) for v in variables) + rb')\b')
+
+
+def _search(path, content, pattern):
+    """Returns a SecretHit for every variable mentioned on every line of content."""
+    hits = []
+    for line_no, line in enumerate(content.splitlines(), start=1):
+        for match in dict.fromkeys(pattern.findall(line)):
+            hits.append(SecretHit(path, line_no, match.decode()))
+    return hits
+
+
+def _read(path):
+    """File contents as bytes, through the privileged helper when the file is not readable directly."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except PermissionError:
+        return require_helper().read_file(path)
+
+
+def _list_home(home, wanted):
+    """Returns [(name, kind, link target)] for the entries of home that are in wanted."""
+    try:
+        found = []
+        with os.scandir(home) as entries:
+            for entry in entries:
+                if entry.name not in wanted:
+                    continue
+                if entry.is_symlink():
+                    found.append((entry.name, 'symlink', os.readlink(entry.path)))
+                else:
+                    found.append((entry.name, 'file' if entry.is_file(follow_symlinks=False) else 'other', None))
+        return found
+    except PermissionError:
+        pass
+    # Not readable as the current user (e.g. 0700 home): one listing, one lstat batch, then readlinks
+    helper = require_helper()
+    paths = [os.path.join(home, name) for name in helper.list_dir(home) if name in wanted]
+    found = []
+    for path, state in helper.stat(paths, follow_symlinks=False).items():
+        if isinstance(state, OSError):
+            continue  # removed since the listing
+        mode = state[0]
+        if stat.S_ISLNK(mode):
+            found.append((os.path.basename(path), 'symlink', helper.readlink(path)))
+        else:
+            found.append((os.path.basename(path), 'file' if stat.S_ISREG(mode) else 'other', None))
+    return found
+
+
+def _scan_home(home, history_names, profile_names, pattern):
+    """Scans one home directory. Returns (history files, secret hits, errors)."""
+    history, hits, errors = [], [], []
+    try:
+        entries = _list_home(home, set(history_names) | set(profile_names))
+    except (NotADirectoryError, FileNotFoundError):
+        return history, hits, errors  # a plain file in /home, or removed meanwhile
+    for name, kind, target in entries:
+        path = os.path.join(home, name)
+        if name in history_names:
+            history.append(HistoryFile(path, kind, target))
+        if name in profile_names and kind != 'other':
+            try:
+                hits.extend(_search(path, _read(path), pattern))
+            except OSError as e:
+                if not (kind == 'symlink' and isinstance(e, FileNotFoundError)):  # dangling link
+                    errors.append((path, str(e)))
+    return history, hits, errors
+
+
+def _list_root(root):
+    """Home directories below root, without stat'ing them (d_type only)."""
+    with os.scandir(root) as entries:
+        return [entry.path for entry in entries if entry.is_dir(follow_symlinks=False) or entry.is_symlink()]
+
+
+def scan_home_directories(variables, home_roots=HOME_ROOTS, extra_homes=EXTRA_HOMES, extra_files=EXTRA_FILES,
+                          profile_names=PROFILE_NAMES, history_names=HISTORY_NAMES,
+                          max_workers=DEFAULT_WORKERS, dir_timeout=DEFAULT_DIR_TIMEOUT):
+    """Visits every home directory once, collecting history files and variables set in profile files.
+
+    Returns HomeScanResult(homes, history, hits, errors, timed_out): the number
+    of homes scanned, HistoryFile and SecretHit lists sorted by path, (path,
+    message) pairs for what could not be read, and the paths that timed out.
+    """
+    pattern = _secret_pattern(variables)
+    errors, timed_out = [], []
+
+    homes = list(extra_homes)
+    for root, (outcome, value) in run_bounded(_list_root, home_roots, max_workers, dir_timeout).items():
+        if outcome == 'ok':
+            homes.extend(value)
+        elif outcome == 'timeout':
+            timed_out.append(root)
+        elif not isinstance(value, FileNotFoundError):
+            errors.append((root, str(value)))
+
+    tasks = [('home', home) for home in homes] + [('file', path) for path in extra_files]
+
+    def scan(task):
+        kind, path = task
+        if kind == 'home':
+            return _scan_home(path, history_names, profile_names, pattern)
+        try:
+            return [], _search(path, _read(path), pattern), []
+        except FileNotFoundError:
+            return [], [], []
+
+    history, hits = [], []
+    for (kind, path), (outcome, value) in run_bounded(scan, tasks, max_workers, dir_timeout).items():
+        if outcome == 'ok':
+            history.extend(value[0])
+            hits.extend(value[1])
+            errors.extend(value[2])
+        elif outcome == 'timeout':
+            timed_out.append(path)
+        else:
+            errors.append((path, str(value)))
+    return HomeScanResult(len(homes), sorted(history), sorted(hits), sorted(errors), sorted(timed_out))
+
+
+class HomeScanner:
+    """Runs scan_home_directories once and shares the result between the checks that need it."""
+
+    def __init__(self, variables, max_workers=DEFAULT_WORKERS, dir_timeout=DEFAULT_DIR_TIMEOUT):
+        self.variables = list(variables)
+        self.max_workers = max_workers
+        self.dir_timeout = dir_timeout
+        self._result = None
+        self._lock = threading.Lock()
+
+    def result(self):
+        """The scan result, scanning on the first call (concurrent callers wait for it)."""
+        with self._lock:
+            if self._result is None:
+                self._result = scan_home_directories(self.variables, max_workers=self.max_workers,
+                                                     dir_timeout=self.dir_timeout)
+            return self._result
@@ -0,0 +1,195 @@
+"""In-process host probes shared by the CIS checkers.
+
+Replaces the shell-outs the OS-level checks used to make ('systemctl
+is-enabled', 'fips-mode-setup --check', one 'pgrep' per process name,
+'df | tail | awk', running a binary to see whether it exists) with reads of
+the files those tools consult themselves: the unit symlinks under
+/etc/systemd, /proc/sys/crypto/fips_enabled, /proc/<pid>/comm and
+/proc/self/mountinfo. No subprocess is started and nothing needs sudo.
+"""
+import os
+import re
+import shutil
+from collections import namedtuple
+
+ProcessMatch = namedtuple('ProcessMatch', ['pid', 'comm'])
+MountInfo = namedtuple('MountInfo', ['mount_point', 'source', 'fstype', 'total_bytes', 'free_bytes'])
+
+# Unit file search path of the system manager, highest priority first
+SYSTEMD_UNIT_DIRS = ('/etc/systemd/system', '/run/systemd/system', '/usr/local/lib/systemd/system',
+                     '/usr/lib/systemd/system', '/lib/systemd/system')
+# Directories systemctl enable links units into, besides <unit dir>/*.wants and *.requires
+SYSTEMD_ENABLE_SUFFIXES = ('.wants', '.requires', '.upholds')
+# sbin directories are often missing from PATH for non-login or sudo'd shells
+EXTRA_BINARY_DIRS = ('/usr/local/sbin', '/usr/local/bin', '/usr/sbin', '/usr/bin', '/sbin', '/bin')
+
+
+def _unit_name(unit):
+    """systemctl accepts 'postgresql-17' for 'postgresql-17.service'."""
+    suffix = unit.rsplit('.', 1)[-1] if '.' in unit else ''
+    if suffix in ('service', 'socket', 'target', 'timer', 'mount', 'path', 'slice', 'scope', 'device', 'swap'):
+        return unit
+    return f"{unit}.service"
+
+
+def _has_install_section(path):
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return any(line.strip() == '[Install]' for line in f)
+    except OSError:
+        return False
+
+
+def systemd_unit_paths(unit, unit_dirs=SYSTEMD_UNIT_DIRS):
+    """What systemd_unit_state looks at, for fingerprinting: ([unit and template file paths], [enable link globs])."""
+    unit = _unit_name(unit)
+    names = [unit]
+    if '@' in unit:
+        names.append(unit.split('@', 1)[0] + '@.' + unit.rsplit('.', 1)[1])
+    paths = [os.path.join(unit_dir, name) for unit_dir in unit_dirs for name in names]
+    link_globs = [os.path.join(unit_dir, f"*{suffix}", unit) for unit_dir in unit_dirs for suffix in SYSTEMD_ENABLE_SUFFIXES]
+    return paths, link_globs
+
+
+def systemd_unit_state(unit, unit_dirs=SYSTEMD_UNIT_DIRS):
+    """Enablement state of a system unit, as 'systemctl is-enabled' would print it.
+
+    Returns 'enabled', 'disabled', 'static' (no [Install] section, cannot be
+    enabled), 'masked' or 'not-found'. 'enabled-runtime' is returned for
+    units only linked under /run.
+    """
+    unit = _unit_name(unit)
+    unit_file = None
+    for unit_dir in unit_dirs:
+        path = os.path.join(unit_dir, unit)
+        if os.path.islink(path) and os.path.realpath(path) == '/dev/null':
+            return 'masked'
+        if unit_file is None and os.path.exists(path):
+            unit_file = path
+    if unit_file is None:
+        # Template instances (postgresql@17-main.service) are defined by postgresql@.service
+        if '@' in unit:
+            template = unit.split('@', 1)[0] + '@.' + unit.rsplit('.', 1)[1]
+            unit_file = next((os.path.join(d, template) for d in unit_dirs
+                              if os.path.exists(os.path.join(d, template))), None)
+        if unit_file is None:
+            return 'not-found'
+
+    for unit_dir in unit_dirs:
+        try:
+            entries = os.listdir(unit_dir)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.endswith(SYSTEMD_ENABLE_SUFFIXES) and os.path.lexists(os.path.join(unit_dir, entry, unit)):
+                return 'enabled-runtime' if unit_dir.startswith('/run/') else 'enabled'
+    return 'disabled' if _has_install_section(unit_file) else 'static'
+
+
+def fips_enabled(proc_root='/proc'):
+    """True/False from the kernel's FIPS flag, None if the kernel does not support FIPS mode."""
+    try:
+        with open(f"{proc_root}/sys/crypto/fips_enabled") as f:
+            return f.read().strip() == '1'
+    except OSError:
+        return None
+
+
+def crypto_policy(path='/etc/crypto-policies/config'):
+    """System-wide crypto policy name (RHEL-based systems), or None."""
+    try:
+        with open(path) as f:
+            lines = [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    except OSError:
+        return None
+    return lines[0] if lines else None
+
+
+def find_processes(names, proc_root='/proc'):
+    """Finds running processes by name, like one 'pgrep -x' per name but in a single /proc walk.
+
+    Returns {name: [ProcessMatch(pid, comm), ...]} with an entry for every
+    requested name (empty when none is running). Names are matched against
+    /proc/<pid>/comm, which the kernel truncates to 15 characters.
+    """
+    wanted = {name[:15]: name for name in names}
+    matches = {name: [] for name in names}
+    own_pid = os.getpid()
+    try:
+        pids = [int(d) for d in os.listdir(proc_root) if d.isdigit() and int(d) != own_pid]
+    except OSError:
+        return matches
+    for pid in sorted(pids):
+        try:
+            with open(f"{proc_root}/{pid}/comm", 'rb') as f:
+                comm = f.read().decode(errors='replace').strip()
+        except OSError:
+            continue  # process exited
+        if comm in wanted:
+            matches[wanted[comm]].append(ProcessMatch(pid, comm))
+    return matches
+
+
+def _unescape_mountinfo(field):
+    """mountinfo escapes space, tab, newline and backslash as octal (\\040)."""
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), field)
+
+
+def mount_info(path, mountinfo='/proc/self/mountinfo'):
+    """Filesystem holding path: MountInfo(mount_point, source, fstype, total_bytes, free_bytes), or None.
+
+    The mount is the deepest mountinfo entry containing the resolved path whose
+    device matches os.stat(path).st_dev (so bind and stacked mounts resolve
+    like df does); sizes come from os.statvfs and are None if path cannot be reached.
+    """
+    real_path = os.path.realpath(path)
+    try:
+        device = os.stat(real_path).st_dev
+        device = f"{os.major(device)}:{os.minor(device)}"
+    except OSError:
+        device = None
+    try:
+        with open(mountinfo, encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    best = None
+    for line in lines:
+        fields = line.split(' ')
+        try:
+            separator = fields.index('-', 6)
+        except ValueError:
+            continue
+        mount_point = _unescape_mountinfo(fields[4])
+        if not (real_path == mount_point or real_path.startswith(mount_point.rstrip('/') + '/')):
+            continue
+        # A later (stacked) mount on the same point hides earlier ones, so >= keeps the last
+        key = (device is None or fields[2] == device, len(mount_point))
+        if best is None or key >= best[0]:
+            best = (key, mount_point, _unescape_mountinfo(fields[separator + 2]), fields[separator + 1])
+    if best is None:
+        return None
+
+    try:
+        stats = os.statvfs(real_path)
+        total, free = stats.f_blocks * stats.f_frsize, stats.f_bavail * stats.f_frsize
+    except OSError:
+        total = free = None
+    return MountInfo(best[1], best[2], best[3], total, free)
+
+
+def format_bytes(size):
+    """Human-readable size (1024-based), as 'df -h' would show it."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if size < 1024 or unit == 'TiB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+
+def which(binary, extra_dirs=EXTRA_BINARY_DIRS):
+    """Full path of an executable found on PATH or in the usual bin/sbin directories, or None."""
+    found = shutil.which(binary)
+    if found:
+        return found
+    return shutil.which(binary, path=os.pathsep.join(extra_dirs))
@@ -0,0 +1,140 @@
+"""In-process file permission engine shared by the CIS checkers.
+
+Paths are stat'ed in batches with os.stat instead of one 'sudo ls -l' per path,
+owner/group ids are resolved through cached pwd/grp lookups, and the numeric
+mode bits are compared against a declared PermissionPolicy. Only paths that
+fail with EACCES are retried in one request to the run's privileged helper.
+"""
+import grp
+import os
+import pwd
+import stat
+from collections import namedtuple
+from functools import lru_cache
+
+from cis_core.privhelper import require_helper
+
+FileState = namedtuple('FileState', ['path', 'mode', 'uid', 'gid', 'owner', 'group', 'error'])
+
+_KIND_BITS = {'file': stat.S_IFREG, 'dir': stat.S_IFDIR}
+
+
+class PermissionPolicy(namedtuple('PermissionPolicy', ['kind', 'required', 'forbidden', 'owner', 'group'])):
+    """Expected state of a path.
+
+    kind      -- 'file' or 'dir'
+    required  -- permission bits that must be set
+    forbidden -- permission bits that must be clear
+    owner, group -- expected owner and group names
+    """
+
+    @classmethod
+    def exact(cls, kind, mode, owner, group):
+        """Policy requiring exactly the given permission bits, e.g. exact('dir', 0o700, ...)."""
+        return cls(kind, mode, 0o7777 & ~mode, owner, group)
+
+    def describe(self):
+        """Human readable description used in the report's Expected line."""
+        if self.required | self.forbidden == 0o7777:
+            perms = f"{self.required:04o} ({stat.filemode(_KIND_BITS[self.kind] | self.required)})"
+        else:
+            perms = f"{self.kind} with bits {self.required:04o} set and {self.forbidden:04o} clear"
+        return f"Permissions {perms}, Owner '{self.owner}', Group '{self.group}'"
+
+
+@lru_cache(maxsize=None)
+def user_name(uid):
+    """Resolves a uid to a user name (cached); falls back to the numeric id."""
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+@lru_cache(maxsize=None)
+def group_name(gid):
+    """Resolves a gid to a group name (cached); falls back to the numeric id."""
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+
+def _state(path, mode, uid, gid):
+    return FileState(path, mode, uid, gid, user_name(uid), group_name(gid), None)
+
+
+class PermissionEngine:
+    """Stats paths in batches and evaluates them against PermissionPolicy objects."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def stat_paths(self, paths, use_sudo=True):
+        """Stats all given paths (following symlinks) and returns {path: FileState}.
+
+        Results are cached, so priming the engine once with every path a run needs
+        makes later per-check lookups free. Paths denied with EACCES are retried in
+        one privileged call when use_sudo is True.
+        """
+        denied = []
+        for path in dict.fromkeys(p for p in paths if p):
+            if path in self.cache:
+                continue
+            try:
+                st = os.stat(path)
+                self.cache[path] = _state(path, st.st_mode, st.st_uid, st.st_gid)
+            except PermissionError:
+                denied.append(path)
+            except OSError as e:
+                self.cache[path] = FileState(path, None, None, None, None, None, e.strerror)
+        for path in denied:
+            self.cache[path] = FileState(path, None, None, None, None, None, "Permission denied")
+        if denied and use_sudo:
+            self._privileged_stat(denied)
+        return {p: self.cache[p] for p in paths if p}
+
+    def _privileged_stat(self, paths):
+        """Stats paths the current user cannot reach with one request to the privileged helper."""
+        try:
+            results = require_helper().stat(paths)
+        except OSError as e:
+            for path in paths:
+                self.cache[path] = self.cache[path]._replace(error=f"Permission denied; privileged stat failed: {e}")
+            return
+        for path, result in results.items():
+            if isinstance(result, OSError):
+                self.cache[path] = self.cache[path]._replace(error=result.strerror)
+            else:
+                self.cache[path] = _state(path, *result)
+
+    def lookup(self, path, use_sudo=True):
+        """Returns the FileState of a single path, stat'ing it if not cached yet."""
+        return self.stat_paths([path], use_sudo=use_sudo)[path]
+
+    @staticmethod
+    def evaluate(state, policy):
+        """Compares a FileState with a policy. Returns a list of failure reasons (empty = PASS)."""
+        if state.error:
+            return [state.error]
+        reasons = []
+        if stat.S_IFMT(state.mode) != _KIND_BITS[policy.kind]:
+            reasons.append(f"Type mismatch ('{stat.filemode(state.mode)}' is not a {policy.kind})")
+        perms = stat.S_IMODE(state.mode)
+        missing = policy.required & ~perms
+        extra = policy.forbidden & perms
+        if missing or extra:
+            reasons.append(f"Permissions mismatch ({perms:04o}: missing bits {missing:04o}, disallowed bits {extra:04o})")
+        if state.owner != policy.owner:
+            reasons.append(f"Owner mismatch ('{state.owner}' vs '{policy.owner}')")
+        if state.group != policy.group:
+            reasons.append(f"Group mismatch ('{state.group}' vs '{policy.group}')")
+        return reasons
+
+    @staticmethod
+    def describe(state):
+        """Human readable description used in the report's Actual line."""
+        if state.error:
+            return f"Permissions 'NOT_FOUND' ({state.error}), Owner 'NOT_FOUND', Group 'NOT_FOUND'"
+        return (f"Permissions '{stat.filemode(state.mode)}' ({stat.S_IMODE(state.mode):04o}), "
+                f"Owner '{state.owner}', Group '{state.group}'")
@@ -0,0 +1,193 @@
+"""Primitives shared by the CIS checkers: shell commands, SQL, file permissions and value comparison.
+
+Every function takes the ResultSink its messages and results go to (and, for
+SQL, the loaded Driver), so each checker binds them to its own report with a
+one-line wrapper. Failures are returned as 'CMD_ERROR:' / 'SQL_ERROR:' /
+'SQL_INFO:' strings for the checks to interpret, never raised.
+
+Shell commands and SQL statements are bounded by the time the current check
+has left (sink.remaining()); a timeout marks the check as timed out. Commands
+that cannot be run, SQL errors and paths that cannot be stat'ed mark the
+check's outcome as uncacheable (see ResultSink.mark_uncacheable), so a
+transient failure is not served from the result cache on later runs.
+"""
+import errno
+import os
+import re
+import subprocess
+
+
+def run_shell_command(sink, command, check_output=True, use_sudo=False, ignore_errors=False):
+    """Executes a shell command and returns its output or exit code."""
+    original_command = command
+    if use_sudo:
+        command = f"sudo {command}"
+    timeout = sink.remaining()
+    if timeout is not None and timeout <= 0:
+        sink.mark_timed_out("time budget exhausted")
+        sink.write(f"  Not running '{original_command}': the check's time budget is exhausted")
+        return "CMD_ERROR: Time budget exhausted" if check_output else False
+    try:
+        # Use check=True only if we expect failure to be exceptional
+        run_check = (not ignore_errors)
+
+        result = subprocess.run(command, shell=True, check=run_check, capture_output=True, text=True, errors='ignore',
+                                timeout=timeout)
+
+        if check_output:
+            # Combine stdout and stderr for more context on failure if check=False
+            if result.returncode != 0 and ignore_errors:
+                return f"CMD_ERROR: Exit Code {result.returncode} - {result.stderr.strip() or result.stdout.strip()}"
+            return result.stdout.strip()
+        else:
+            return result.returncode == 0 # Return True if command succeeds (exit code 0)
+
+    except subprocess.TimeoutExpired:
+        sink.mark_timed_out(f"command timed out after {timeout:.1f}s")
+        sink.write(f"  Command '{original_command}' timed out after {timeout:.1f}s")
+        return f"CMD_ERROR: Timed out after {timeout:.1f}s" if check_output else False
+    except subprocess.CalledProcessError as e:
+        sink.write(f"  Error running command '{original_command}': {e.stderr or e.stdout}")
+        if check_output:
+            return f"CMD_ERROR: {e.stderr or e.stdout}"
+        else:
+            return False
+    except FileNotFoundError as e:
+        sink.mark_uncacheable()
+        sink.write(f"  Error: Command prefix not found for '{original_command}': {e}. Is the program installed and in PATH?")
+        if check_output:
+            return "CMD_ERROR: Command not found"
+        else:
+            return False
+    except Exception as e:
+        sink.mark_uncacheable()
+        sink.write(f"  Unexpected error running command '{original_command}': {e}")
+        if check_output:
+            return f"CMD_ERROR: Unexpected {e}"
+        else:
+            return False
+
+
+def execute_sql(sink, driver, cursor, sql_query, params=None, fetch_one=False):
+    """Executes a query and returns the rows (or the first column of the first row).
+
+    Errors of the driver's missing_errors classes (undefined setting, table...)
+    are returned as 'SQL_INFO:', other driver errors as 'SQL_ERROR:'. A
+    statement cancelled by the server-side statement timeout marks the check
+    as timed out (and rolls back the transaction it aborted).
+    """
+    if not cursor:
+        sink.mark_uncacheable()
+        return "SQL_ERROR: No database connection"
+    remaining = sink.remaining()
+    if remaining is not None and remaining <= 0:
+        sink.mark_timed_out("time budget exhausted")
+        return "SQL_ERROR: Time budget exhausted"
+    sink.before_statement()
+    sql_errors = driver.sql_errors if driver else ()
+    params_note = f" (Params: {params})" if params is not None else ""
+    try:
+        cursor.execute(sql_query, params)
+        if fetch_one:
+            result = cursor.fetchone()
+            return result[0] if result else None
+        else:
+            return cursor.fetchall()
+    except sql_errors as err:
+        if driver.is_timeout(err):
+            sink.mark_timed_out("statement timeout")
+            sink.write(f"  SQL '{sql_query}' cancelled by the statement timeout")
+            connection = getattr(cursor, 'connection', None)
+            if connection is not None and hasattr(connection, 'rollback'):
+                try:
+                    connection.rollback()  # PostgreSQL aborts the transaction; later queries would fail
+                except Exception:
+                    pass
+            return f"SQL_ERROR: Statement timeout - {err}"
+        if isinstance(err, driver.missing_errors):
+            sink.write(f"  Info: SQL query failed possibly due to missing feature/object '{sql_query}': {err}")
+            return f"SQL_INFO: Feature/Object missing - {err}"
+        sink.mark_uncacheable()
+        sink.write(f"  Error executing SQL '{sql_query}'{params_note}: {err}")
+        # Propagate the error message for checks to interpret
+        return f"SQL_ERROR: {err}"
+    except Exception as e:
+        sink.mark_uncacheable()
+        sink.write(f"  Unexpected error executing SQL '{sql_query}'{params_note}: {e}")
+        return f"SQL_ERROR: Unexpected {e}"
+
+
+def check_file_permissions(sink, perms, path, policy, use_sudo=True):
+    """Checks file/directory permissions and ownership against a PermissionPolicy."""
+    if not path or path == 'NULL':
+        sink.write(f"  Path is not set or invalid: {path}")
+        sink.record("FAIL", item=path, note="Path Invalid")
+        return False
+
+    # Stat in-process (cached); sudo is only used for paths denied with EACCES
+    state = perms.lookup(path, use_sudo=use_sudo)
+    fail_reasons = perms.evaluate(state, policy)
+    status = "FAIL" if fail_reasons else "PASS"
+    if state.error and state.error != os.strerror(errno.ENOENT):
+        sink.mark_uncacheable()  # a missing path is a result; a path we could not stat is not
+    if fail_reasons and not state.error:
+        sink.write(f"  Failure reasons: {'; '.join(fail_reasons)}")
+
+    sink.write(f"  Path:     {path}")
+    sink.record(status, policy.describe(), perms.describe(state), item=path)
+    return status == "PASS"
+
+
+def as_text(value):
+    """Decodes bytes/bytearray values (some drivers return them for VARBINARY/BLOB columns)."""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode(errors='replace')
+    return value
+
+
+def convert_value(actual_value, expected_value):
+    """Converts a setting as shown by the server to the type of the expected value.
+
+    Booleans are shown as 'on'/'off' (PostgreSQL) or 'ON'/'OFF' (MySQL/MariaDB);
+    values that do not convert are compared as strings.
+    """
+    try:
+        if isinstance(expected_value, bool):
+            return str(actual_value).lower() == 'on'
+        elif isinstance(expected_value, int):
+            return int(actual_value)
+        elif isinstance(expected_value, float):
+            return float(actual_value)
+    except (ValueError, TypeError):
+        pass
+    return actual_value
+
+
+def compare_values(actual_value, expected_value, comparison='=='):
+    """True when a setting satisfies 'actual <comparison> expected'.
+
+    comparison is one of ==, !=, >=, <=, >, <, in, notin (or not_in), is_set
+    and matches_pattern. May raise TypeError for values that do not compare.
+    """
+    converted_actual = convert_value(actual_value, expected_value)
+    if comparison == '==':
+        return converted_actual == expected_value
+    elif comparison == '!=':
+        return converted_actual != expected_value
+    elif comparison == '>=':
+        return converted_actual >= expected_value
+    elif comparison == '<=':
+        return converted_actual <= expected_value
+    elif comparison == '>':
+        return converted_actual > expected_value
+    elif comparison == '<':
+        return converted_actual < expected_value
+    elif comparison == 'in':
+        return str(expected_value) in str(actual_value) # String contains check
+    elif comparison in ('notin', 'not_in'):
+        return str(expected_value) not in str(actual_value)
+    elif comparison == 'is_set':
+        return actual_value is not None and actual_value != ''
+    elif comparison == 'matches_pattern':
+        return re.search(expected_value, str(actual_value)) is not None
+    return False
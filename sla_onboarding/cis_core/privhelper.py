@@ -0,0 +1,300 @@
+"""Persistent privileged helper shared by the CIS checkers.
+
+Instead of one 'sudo stat' / 'sudo cat' / 'sudo ls' / 'sudo grep' per denied
+path, the first privileged request of a run starts this file as a helper
+process under 'sudo -n' (sudo's password, if any, is asked once at startup
+by registry.have_root). The helper then serves stat, read-file, list-dir,
+readlink and environ-scan requests over its stdin/stdout pipes until the
+checker exits, so PAM, sudoers evaluation and fork are paid once per run.
+
+Protocol: a request is a 5 byte header (opcode, body length) followed by a
+JSON body; a response is a 9 byte header (status, meta length, data length)
+followed by the JSON meta and raw data bytes (file contents). Paths travel as
+JSON strings; undecodable bytes in file names survive via surrogateescape.
+
+Every request must be answered within the helper's request timeout: a stat or
+read that hangs (a stale NFS home) would otherwise hold the request lock, and
+with it every later privileged request of every thread, forever. A helper
+that does not answer in time is killed and the next request starts a new one
+(at most MAX_RESTARTS times per run).
+
+The helper side only uses the standard library: it is run as a script with
+'python3 -I', so it never imports the cis_core package as root.
+"""
+import atexit
+import json
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+OP_QUIT, OP_STAT, OP_READ, OP_LISTDIR, OP_ENVIRON, OP_READLINK = range(6)
+STATUS_OK, STATUS_ERROR = 0, 1
+
+REQUEST_HEADER = struct.Struct('!BI')
+RESPONSE_HEADER = struct.Struct('!BII')
+
+DEFAULT_READ_LIMIT = 16 * 1024 * 1024  # largest file read-file returns, in bytes
+DEFAULT_REQUEST_TIMEOUT = 30.0          # seconds the helper has to answer one request; <= 0 waits forever
+MAX_RESTARTS = 3                        # helpers started again after one was killed, per run
+
+
+def _read_exact(stream, size, deadline=None):
+    """Reads exactly size bytes; returns b'' on a clean EOF before the first byte.
+
+    With a deadline (time.monotonic()), raises TimeoutError when the bytes do not arrive by then.
+    """
+    data = b''
+    while len(data) < size:
+        if deadline is not None:
+            wait = deadline - time.monotonic()
+            if wait <= 0 or not select.select([stream], [], [], wait)[0]:
+                raise TimeoutError("No answer within the request timeout")
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            if data:
+                raise EOFError("Truncated frame")
+            return b''
+        data += chunk
+    return data
+
+
+# --- Helper side (runs as root) ---
+
+def _error_meta(err):
+    return {'errno': err.errno, 'error': err.strerror or str(err)}
+
+
+def _serve_stat(body):
+    results = []
+    follow = body.get('follow', True)
+    for path in body['paths']:
+        try:
+            st = os.stat(path, follow_symlinks=follow)
+            results.append([st.st_mode, st.st_uid, st.st_gid])
+        except OSError as e:
+            results.append(_error_meta(e))
+    return {'results': results}, b''
+
+
+def _serve_read(body):
+    with open(body['path'], 'rb') as f:
+        data = f.read(body.get('limit') or DEFAULT_READ_LIMIT)
+    return {}, data
+
+
+def _serve_listdir(body):
+    return {'names': os.listdir(body['path'])}, b''
+
+
+def _serve_readlink(body):
+    return {'target': os.readlink(body['path'])}, b''
+
+
+def _serve_environ(body):
+    needles = [(v, b'\0' + os.fsencode(v) + b'=') for v in body['variables']]
+    proc_root = body.get('proc_root', '/proc')
+    hits = []
+    unreadable = 0
+    for pid in body['pids']:
+        try:
+            with open(f"{proc_root}/{pid}/environ", 'rb') as f:
+                data = b'\0' + f.read()
+        except FileNotFoundError:
+            continue  # process exited
+        except OSError:
+            unreadable += 1
+            continue
+        hits.extend([pid, variable] for variable, needle in needles if needle in data)
+    return {'hits': hits, 'unreadable': unreadable}, b''
+
+
+HANDLERS = {OP_STAT: _serve_stat, OP_READ: _serve_read, OP_LISTDIR: _serve_listdir, OP_ENVIRON: _serve_environ,
+            OP_READLINK: _serve_readlink}
+
+
+def serve(stdin, stdout):
+    """Answers requests until OP_QUIT or EOF on stdin."""
+    while True:
+        header = _read_exact(stdin, REQUEST_HEADER.size)
+        if not header:
+            return
+        op, length = REQUEST_HEADER.unpack(header)
+        body = json.loads(_read_exact(stdin, length) or b'{}')
+        if op == OP_QUIT:
+            return
+        handler = HANDLERS.get(op)
+        try:
+            if handler is None:
+                raise OSError(f"Unknown opcode {op}")
+            meta, data = handler(body)
+            status = STATUS_OK
+        except OSError as e:
+            meta, data, status = _error_meta(e), b'', STATUS_ERROR
+        except (KeyError, TypeError, ValueError) as e:
+            meta, data, status = {'errno': 0, 'error': f"Bad request: {e}"}, b'', STATUS_ERROR
+        meta = json.dumps(meta).encode('ascii')
+        stdout.write(RESPONSE_HEADER.pack(status, len(meta), len(data)) + meta + data)
+        stdout.flush()
+
+
+# --- Checker side ---
+
+class HelperError(OSError):
+    """The helper could not be started or stopped answering."""
+
+
+def _os_error(meta):
+    """Rebuilds the helper's error; OSError(errno, text) maps errno to PermissionError, FileNotFoundError..."""
+    if meta.get('errno'):
+        return OSError(meta['errno'], meta['error'])
+    return OSError(meta.get('error', 'Unknown error'))
+
+
+class PrivilegedHelper:
+    """Client for a running helper process. Requests are serialized, so one helper serves all check threads."""
+
+    def __init__(self, process, request_timeout=DEFAULT_REQUEST_TIMEOUT):
+        self.process = process
+        self.request_timeout = request_timeout
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.killed = False
+
+    @classmethod
+    def start(cls):
+        """Starts the helper (through 'sudo -n' unless already root). Raises HelperError if it does not come up."""
+        command = [sys.executable, '-I', os.path.abspath(__file__), '--serve']
+        if os.geteuid() != 0:
+            command = ['sudo', '-n', '--'] + command
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, bufsize=0)
+        except OSError as e:
+            raise HelperError(f"Could not start privileged helper: {e}")
+        helper = cls(process)
+        try:
+            helper.stat([])  # handshake: fails if sudo refused to run the helper
+        except HelperError:
+            stderr = process.stderr.read().decode(errors='replace').strip()
+            process.wait()
+            raise HelperError(f"Privileged helper did not start: {stderr or 'no response'}")
+        return helper
+
+    def alive(self):
+        return not self.killed and self.process.poll() is None
+
+    def kill(self):
+        """Kills the helper without waiting for it (a process stuck on a hung mount may not exit yet)."""
+        self.killed = True
+        self.process.kill()
+
+    def _request(self, op, body):
+        """Sends one request. Returns (meta, data); raises OSError for a failed request.
+
+        A helper that does not answer within request_timeout is killed (HelperError).
+        """
+        payload = json.dumps(body).encode('ascii')
+        with self.lock:
+            if not self.alive():
+                raise HelperError("Privileged helper is not running")
+            deadline = time.monotonic() + self.request_timeout if self.request_timeout and self.request_timeout > 0 else None
+            try:
+                self.process.stdin.write(REQUEST_HEADER.pack(op, len(payload)) + payload)
+                self.process.stdin.flush()
+                header = _read_exact(self.process.stdout, RESPONSE_HEADER.size, deadline)
+                if not header:
+                    raise EOFError("Helper closed its output")
+                status, meta_length, data_length = RESPONSE_HEADER.unpack(header)
+                meta = json.loads(_read_exact(self.process.stdout, meta_length, deadline))
+                data = _read_exact(self.process.stdout, data_length, deadline) if data_length else b''
+            except (OSError, EOFError, ValueError) as e:
+                self.kill()
+                raise HelperError(f"Privileged helper failed: {e}")
+            self.requests += 1
+        if status != STATUS_OK:
+            raise _os_error(meta)
+        return meta, data
+
+    def stat(self, paths, follow_symlinks=True):
+        """Stats paths (lstat with follow_symlinks=False). Returns {path: (mode, uid, gid) or OSError}."""
+        paths = list(paths)
+        meta, _ = self._request(OP_STAT, {'paths': paths, 'follow': follow_symlinks})
+        return {path: tuple(result) if isinstance(result, list) else _os_error(result)
+                for path, result in zip(paths, meta['results'])}
+
+    def read_file(self, path, limit=DEFAULT_READ_LIMIT):
+        """Returns the contents of a file (at most limit bytes) as bytes."""
+        _, data = self._request(OP_READ, {'path': path, 'limit': limit})
+        return data
+
+    def list_dir(self, path):
+        """Returns the entry names of a directory, like os.listdir."""
+        meta, _ = self._request(OP_LISTDIR, {'path': path})
+        return meta['names']
+
+    def readlink(self, path):
+        """Returns the target of a symbolic link, like os.readlink."""
+        meta, _ = self._request(OP_READLINK, {'path': path})
+        return meta['target']
+
+    def environ_scan(self, pids, variables, proc_root='/proc'):
+        """Searches /proc/<pid>/environ of the given pids for the variables.
+
+        Returns ([(pid, variable), ...], number of environments still unreadable).
+        """
+        meta, _ = self._request(OP_ENVIRON, {'pids': list(pids), 'variables': list(variables), 'proc_root': proc_root})
+        return [tuple(hit) for hit in meta['hits']], meta['unreadable']
+
+    def close(self):
+        """Asks the helper to exit and waits for it."""
+        if self.alive():
+            try:
+                self.process.stdin.write(REQUEST_HEADER.pack(OP_QUIT, 0))
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+
+
+_helper = None
+_helper_error = None
+_helper_restarts = 0
+_helper_lock = threading.Lock()
+
+
+def get_helper():
+    """The run's helper, started on first use and again after it was killed (at most MAX_RESTARTS times).
+
+    Returns None if it cannot be started (the failure is remembered).
+    """
+    global _helper, _helper_error, _helper_restarts
+    with _helper_lock:
+        if _helper is not None and not _helper.alive() and _helper_error is None:
+            if _helper_restarts >= MAX_RESTARTS:
+                _helper_error = HelperError(f"Privileged helper stopped answering {_helper_restarts + 1} times; not restarted")
+            else:
+                _helper_restarts += 1
+                _helper = None
+        if _helper is None and _helper_error is None:
+            try:
+                _helper = PrivilegedHelper.start()
+                atexit.register(_helper.close)
+            except HelperError as e:
+                _helper_error = e
+        return _helper if _helper_error is None else None
+
+
+def require_helper():
+    """The run's helper; raises HelperError (why it could not be started) instead of returning None."""
+    helper = get_helper()
+    if helper is None:
+        raise _helper_error
+    return helper
+
+
+if __name__ == '__main__' and sys.argv[1:] == ['--serve']:
+    serve(sys.stdin.buffer, sys.stdout.buffer)
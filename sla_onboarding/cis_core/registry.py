@@ -0,0 +1,267 @@
+"""Check registry and scheduler shared by the CIS checkers.
+
+Checks are registered as units with the resources they need ('cursor' for a
+database connection, 'pgdata' for a known data directory, 'root' for root or
+passwordless sudo) and the side they run on. OS-side checks (subprocesses,
+filesystem and /proc walks) run on a pool of daemon threads while DB-side checks run one
+after another on the calling thread, which owns the connection. Every check's
+output is captured and replayed in registration order, so the report does not
+depend on which check finished first.
+
+With a TimeBudget on the sink, an OS-side check still running when its budget
+runs out is abandoned and reported as TIMEOUT, and checks that have not
+started by the run deadline are not started at all. An abandoned check's
+worker is replaced so the remaining checks keep their parallelism; being a
+daemon thread, it does not keep the process alive once the report is
+written (ThreadPoolExecutor workers are joined at exit, so a check stuck on a
+hung mount would have held the process until it returned).
+"""
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from cis_core.deadline import TIMEOUT
+
+DEFAULT_WORKERS = 4
+
+Check = namedtuple('Check', [
+    'check_id',  # e.g. '1.3'
+    'title',     # shown in the '[id] title' header
+    'section',   # e.g. 'Section 1: Installation and Patches'
+    'func',      # called with the run context
+    'needs',     # tuple of 'cursor', 'pgdata', 'root'
+    'side',      # 'os' (thread pool) or 'db' (connection thread)
+    'on_unmet',  # status recorded when a need other than 'cursor' is missing
+    'inputs',    # None, or func(ctx) -> [(kind, key), ...] fingerprinting the check (see cis_core.cache)
+])
+
+# Why a check is skipped when one of its needs is not available
+UNMET_REASONS = {
+    'cursor': "no database connection",
+    'pgdata': "the data directory could not be determined",
+    'root': "it requires root or passwordless sudo",
+}
+
+
+class CheckRegistry:
+    """Ordered collection of checks; registration order is report order."""
+
+    def __init__(self):
+        self.checks = []
+
+    def register(self, check_id, title, section, needs=(), side='os', on_unmet='NA', inputs=None):
+        """Decorator registering func(ctx) as a check.
+
+        inputs declares what the check's outcome depends on, so an unchanged
+        result can be served from a ResultCache; checks without inputs always run.
+        """
+        if side not in ('os', 'db'):
+            raise ValueError(f"Unknown side '{side}' for check {check_id}")
+
+        def decorator(func):
+            self.checks.append(Check(check_id, title, section, func, tuple(needs), side, on_unmet, inputs))
+            return func
+        return decorator
+
+
+def have_root(interactive=True):
+    """True when running as root or sudo works without a password.
+
+    On a terminal, sudo is asked for its password once here, on the main
+    thread, so that checks running on worker threads never prompt.
+    """
+    if os.geteuid() == 0:
+        return True
+    try:
+        if subprocess.run(['sudo', '-n', 'true'], capture_output=True).returncode == 0:
+            return True
+        if interactive and sys.stdin.isatty():
+            return subprocess.run(['sudo', '-v']).returncode == 0
+    except OSError:
+        pass
+    return False
+
+
+class _DaemonPool:
+    """Runs submitted calls on at most max_workers daemon threads (plus replacements)."""
+
+    def __init__(self, max_workers):
+        self.tasks = queue.SimpleQueue()
+        self.workers = 0
+        for _ in range(max(1, max_workers)):
+            self.add_worker()
+
+    def add_worker(self):
+        """Starts one more worker, e.g. to replace one stuck in an abandoned check."""
+        self.workers += 1
+        threading.Thread(target=self._work, name='cis-check', daemon=True).start()
+
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            future, func, args = task
+            if not future.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+            try:
+                result = func(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, *args):
+        future = Future()
+        self.tasks.put((future, func, args))
+        return future
+
+    def shutdown(self, futures=()):
+        """Cancels the given futures that have not started and lets idle workers exit."""
+        for future in futures:
+            future.cancel()
+        for _ in range(self.workers):
+            self.tasks.put(None)
+
+
+def _run_captured(sink, check, ctx, started=None):
+    """Runs one check with its output captured. Returns the capture buffer.
+
+    started, if given, receives the check's start time (for the scheduler's budget).
+    """
+    if sink.budget is not None and sink.budget.run_expired():
+        return _timeout_buffer(sink, check, "not started: the run deadline had passed")
+    if started is not None:
+        started[check.check_id] = time.monotonic()
+    with sink.capture(check.section) as buffer:
+        sink.begin_check(check.check_id, check.title)
+        try:
+            check.func(ctx)
+        except Exception as e:
+            sink.write(f"  Unexpected error in check {check.check_id}: {e}")
+            sink.record("FAIL", note="Check raised an exception")
+    return buffer
+
+
+def _timeout_buffer(sink, check, reason, duration=None):
+    """Capture buffer reporting a check as TIMEOUT without (or instead of) its own output."""
+    with sink.capture(check.section) as buffer:
+        sink.begin_check(check.check_id, check.title)
+        sink.write(f"  Check {reason}.")
+        sink.record(TIMEOUT, note=reason, duration=duration)
+    return buffer
+
+
+def _await_check(sink, check, future, started, pool):
+    """Waits for an OS-side check within its budget. Returns its buffer, or a TIMEOUT buffer."""
+    budget = sink.budget
+    if budget is None:
+        return future.result()
+    while True:
+        start = started.get(check.check_id)
+        if start is None:
+            deadline = budget.run_deadline  # still queued behind other checks
+        else:
+            deadline = budget.deadline_for(check.check_id, start)
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if start is None and not future.done():
+            wait = 0.05 if wait is None else min(wait, 0.05)  # re-read the start time shortly
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeout:
+            if start is None and not budget.run_expired():
+                continue  # queued; its own budget starts when it does
+            if future.cancel() or start is None:
+                return _timeout_buffer(sink, check, "not started: the run deadline had passed")
+            elapsed = time.monotonic() - start
+            pool.add_worker()  # the abandoned check keeps its thread busy
+            return _timeout_buffer(sink, check, f"abandoned after {elapsed:.1f}s (budget exceeded)", elapsed)
+
+
+def _declared_inputs(check, ctx):
+    try:
+        return list(check.inputs(ctx))
+    except Exception:
+        return None  # inputs cannot be determined; just run the check
+
+
+def run_checks(registry, sink, ctx, available, max_workers=DEFAULT_WORKERS, sides=('os', 'db'), cache=None):
+    """Runs the registered checks and writes the results in registration order.
+
+    available maps each need ('cursor', 'pgdata', 'root') to whether it is met.
+    Checks missing the database connection are skipped with one line per
+    section; checks missing anything else record their on_unmet status.
+    Only checks on the given sides are run (fleet mode runs just 'db').
+    With a ResultCache, checks whose input fingerprint is unchanged are
+    replayed from the cache instead of being run.
+    """
+    plan = [(check, [need for need in check.needs if not available.get(need)])
+            for check in registry.checks if check.side in sides]
+
+    fingerprints = {}
+    cached = {}
+    if cache is not None:
+        inputs = {check.check_id: _declared_inputs(check, ctx)
+                  for check, missing in plan if not missing and check.inputs}
+        fingerprints = cache.fingerprints({cid: found for cid, found in inputs.items() if found})
+        for check_id, fingerprint in fingerprints.items():
+            hit = cache.lookup(check_id, fingerprint)
+            if hit:
+                cached[check_id] = hit
+
+    # Daemon workers: shutting down must not wait for checks abandoned after their budget
+    pool = _DaemonPool(max_workers)
+    started = {}
+    os_futures = {}
+    try:
+        os_futures = {check.check_id: pool.submit(_run_captured, sink, check, ctx, started)
+                      for check, missing in plan
+                      if not missing and check.side == 'os' and check.check_id not in cached}
+        # DB checks share one connection, so they run in order on this thread
+        db_buffers = {check.check_id: _run_captured(sink, check, ctx)
+                      for check, missing in plan
+                      if not missing and check.side == 'db' and check.check_id not in cached}
+
+        section = None
+        db_skip_written = False
+        for check, missing in plan:
+            if check.section != section:
+                section = check.section
+                db_skip_written = False
+                sink.begin_section(section)
+            if 'cursor' in missing:
+                if not db_skip_written:
+                    sink.write(f"  Skipping DB-dependent checks in {section.split(':')[0]} due to connection failure.")
+                    db_skip_written = True
+            elif missing:
+                sink.begin_check(check.check_id, check.title)
+                sink.write(f"  Skipping check as {' and '.join(UNMET_REASONS[need] for need in missing)}.")
+                sink.record(check.on_unmet)
+            elif check.check_id in cached:
+                buffer, stored_at = cached[check.check_id]
+                # First entry is the '[id] title' header
+                sink.replay(buffer[:1])
+                sink.write(f"  (Served from cache: inputs unchanged since {stored_at})")
+                sink.replay(buffer[1:])
+            else:
+                if check.side == 'os':
+                    buffer = _await_check(sink, check, os_futures[check.check_id], started, pool)
+                else:
+                    buffer = db_buffers[check.check_id]
+                sink.replay(buffer)
+                # Timeouts and outcomes of read/scan errors are not stored: the next run retries them
+                uncacheable = any(kind == 'nocache' or (kind == 'result' and entry.status == TIMEOUT)
+                                  for kind, entry in buffer)
+                if check.check_id in fingerprints and not uncacheable:
+                    cache.store(check.check_id, fingerprints[check.check_id], buffer)
+    finally:
+        pool.shutdown(os_futures.values())
+
+    if cache is not None and cache.hits:
+        sink.write(f"\nServed from cache ({len(cache.hits)} checks, inputs unchanged): {', '.join(cache.hits)}")
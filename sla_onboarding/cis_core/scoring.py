@@ -0,0 +1,136 @@
+"""Compliance tally of the CIS checkers, kept up to date as results are recorded.
+
+cis_integration.sh used to find the report with 'ls -t <prefix>_*.txt | head -1'
+(slower as old reports pile up, and liable to pick another concurrent run's
+file) and count its Status lines with four 'grep -c' passes. Instead the
+ResultSink hands every CheckResult to a ComplianceTally, which counts the
+statuses overall and per section; at the end of the run the checker writes the
+counts, the per-section and weighted scores and the exact paths of the files
+it wrote to the --summary file the calling script asked for.
+
+Scores are the integer percentage of PASS among the applicable (PASS, FAIL
+and TIMEOUT) results: a check that timed out was not shown to pass, so a run
+whose slow checks time out does not score higher than a complete one. The
+weighted score averages the section scores, each section counted with its
+weight from the optional [scoring] config section (default 1):
+
+    [scoring]
+    # section number = weight
+    3 = 2
+    6 = 0.5
+"""
+import os
+import re
+from collections import Counter
+
+SECTION_NUMBER = re.compile(r'Section (\d+)')
+DEFAULT_WEIGHT = 1.0
+
+
+def applicable(counts):
+    """Results that count towards a score: PASS, FAIL and TIMEOUT (applicable but not passed)."""
+    return counts['PASS'] + counts['FAIL'] + counts['TIMEOUT']
+
+
+def percent(counts):
+    """Integer percentage of PASS among the applicable results of a status Counter, None if there are none."""
+    total = applicable(counts)
+    return counts['PASS'] * 100 // total if total else None
+
+
+def weights_from_config(config):
+    """{section number: weight} of the optional [scoring] section."""
+    if not config.has_section('scoring'):
+        return {}
+    return {number: config.getfloat('scoring', number) for number in config.options('scoring')}
+
+
+class ComplianceTally:
+    """Status counts of the results recorded so far, overall and per report section."""
+
+    def __init__(self, weights=None):
+        self.weights = dict(weights or {})  # {section number: weight}
+        self.counts = Counter()             # {status: results}
+        self.sections = {}                  # {section title: Counter of statuses}, in report order
+
+    def add(self, result):
+        self.counts[result.status] += 1
+        if result.section is not None:
+            self.sections.setdefault(result.section, Counter())[result.status] += 1
+
+    def merge(self, other):
+        """Adds the counts of another tally (e.g. one fleet target's) to this one."""
+        self.counts.update(other.counts)
+        for section, counts in other.sections.items():
+            self.sections.setdefault(section, Counter()).update(counts)
+
+    def weight(self, section):
+        match = SECTION_NUMBER.match(section)
+        return self.weights.get(match.group(1), DEFAULT_WEIGHT) if match else DEFAULT_WEIGHT
+
+    @property
+    def total(self):
+        """Results with a PASS, FAIL, NA or TIMEOUT status (MANUAL results are not checks the run decided)."""
+        return self.counts['PASS'] + self.counts['FAIL'] + self.counts['NA'] + self.counts['TIMEOUT']
+
+    def score(self):
+        return percent(self.counts)
+
+    def section_scores(self):
+        """[(section title, status counts, score or None)], in report order."""
+        return [(section, counts, percent(counts)) for section, counts in self.sections.items()]
+
+    def weighted_score(self):
+        """Weighted average of the section scores, None if no section has an applicable result."""
+        weighted = total_weight = 0.0
+        for section, counts, _ in self.section_scores():
+            section_applicable = applicable(counts)
+            if not section_applicable:
+                continue
+            weight = self.weight(section)
+            weighted += weight * counts['PASS'] / section_applicable
+            total_weight += weight
+        return int(weighted * 100 / total_weight) if total_weight else None
+
+    def status_counts(self):
+        """'PASS=.. FAIL=.. NA=.. TIMEOUT=.. MANUAL=..' for one-line summaries."""
+        counts = self.counts
+        return (f"PASS={counts['PASS']} FAIL={counts['FAIL']} NA={counts['NA']} "
+                f"TIMEOUT={counts['TIMEOUT']} MANUAL={counts['MANUAL']}")
+
+    def report_lines(self):
+        """Summary block for the end of the text report."""
+        score = self.score()
+        lines = [f"Compliance summary: {self.status_counts()}"]
+        for section, section_counts, section_score in self.section_scores():
+            shown = f"{section_score}%" if section_score is not None else "n/a"
+            lines.append(f"  {section}: {shown} ({section_counts['PASS']}/{applicable(section_counts)} applicable)")
+        weighted = self.weighted_score()
+        lines.append(f"  Compliance score: {score if score is not None else 0}%, weighted: "
+                     f"{f'{weighted}%' if weighted is not None else 'n/a'}")
+        return lines
+
+
+def write_summary(path, tally, report_file, ndjson_file=None):
+    """Writes the tally and the report paths as 'key=value' lines for the calling script.
+
+    Sections are 'section=<title>\\t<pass>\\t<fail>\\t<na>\\t<timeout>\\t<score>'
+    lines, the score left empty when the section has no applicable result.
+    """
+    score = tally.score()
+    weighted = tally.weighted_score()
+    lines = [f"report_file={os.path.abspath(report_file)}",
+             f"ndjson_file={os.path.abspath(ndjson_file) if ndjson_file and ndjson_file != '-' else ''}",
+             f"total={tally.total}",
+             f"passed={tally.counts['PASS']}",
+             f"failed={tally.counts['FAIL']}",
+             f"na={tally.counts['NA']}",
+             f"timeout={tally.counts['TIMEOUT']}",
+             f"manual={tally.counts['MANUAL']}",
+             f"score={score if score is not None else 0}",
+             f"weighted_score={weighted if weighted is not None else ''}"]
+    for section, counts, section_score in tally.section_scores():
+        lines.append(f"section={section}\t{counts['PASS']}\t{counts['FAIL']}\t{counts['NA']}\t"
+                     f"{counts['TIMEOUT']}\t{section_score if section_score is not None else ''}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
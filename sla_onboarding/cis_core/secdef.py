@@ -0,0 +1,116 @@
+"""Streaming SECURITY DEFINER function audit for the PostgreSQL checker (4.5).
+
+Check 4.5 used to fetchall() every SECURITY DEFINER function of a database
+and treat any owner but 'postgres' as suspicious. Instead the functions are
+read through a named (server-side) cursor batch_size rows at a time and each
+owner is classified once: superuser (rolsuper), trusted (one of the
+configured trusted roles or a member of one, directly or through other
+roles) or untrusted. Only counts per (schema, owner) stay in memory; the full
+list goes to a separate CSV detail file, so neither the process nor the
+report grows with the number of functions.
+"""
+import csv
+import threading
+from collections import Counter
+
+# Owner facts are computed once per owner (not per function) and repeated on its rows
+SECDEF_QUERY = """
+    WITH owners AS (
+        SELECT r.oid, r.rolname, r.rolsuper,
+               ARRAY(SELECT g.rolname FROM pg_roles g
+                     WHERE g.oid <> r.oid AND pg_has_role(r.oid, g.oid, 'MEMBER')) AS member_of
+        FROM pg_roles r
+        WHERE r.oid IN (SELECT proowner FROM pg_proc WHERE prosecdef)
+    )
+    SELECT n.nspname, p.proname, pg_get_function_identity_arguments(p.oid) AS args,
+           o.rolname AS owner, o.rolsuper, o.member_of
+    FROM pg_proc p
+    JOIN pg_namespace n ON p.pronamespace = n.oid
+    JOIN owners o ON p.proowner = o.oid
+    WHERE p.prosecdef = true
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema');
+"""
+DEFAULT_BATCH_SIZE = 2000   # rows fetched per fetchmany() call
+OWNER_CLASSES = ('untrusted', 'trusted', 'superuser')
+DETAIL_HEADER = ('database', 'schema', 'function', 'arguments', 'owner', 'owner_class')
+
+
+def owner_class(rolsuper, owner, member_of, trusted_roles):
+    """'superuser', 'trusted' (a trusted role or member of one) or 'untrusted'."""
+    if rolsuper:
+        return 'superuser'
+    if owner in trusted_roles or not trusted_roles.isdisjoint(member_of):
+        return 'trusted'
+    return 'untrusted'
+
+
+class SecdefSummary:
+    """SECURITY DEFINER functions of one database, counted per (schema, owner, owner class)."""
+
+    def __init__(self, dbname):
+        self.dbname = dbname
+        self.counts = Counter()
+        self.scanned = 0
+
+    def by_class(self):
+        """{owner class: number of functions}."""
+        totals = dict.fromkeys(OWNER_CLASSES, 0)
+        for (_, _, cls), count in self.counts.items():
+            totals[cls] += count
+        return totals
+
+
+class SecdefAudit:
+    """Scans databases for SECURITY DEFINER functions; scan(cursor, dbname) can run on several threads.
+
+    Detail rows are appended to the CSV file at path, which is created on the
+    first row written (so a run without any function leaves no file).
+    """
+
+    def __init__(self, path, trusted_roles=(), batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.trusted_roles = frozenset(trusted_roles)
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _write(self, rows):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'w', newline='', encoding='utf-8')
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(DETAIL_HEADER)
+            self._writer.writerows(rows)
+            self.rows_written += len(rows)
+
+    def scan(self, cursor, dbname):
+        """Streams the SECURITY DEFINER functions of the database cursor is connected to.
+
+        cursor should be a streaming cursor (see Driver.stream_cursor). Returns
+        a SecdefSummary; driver errors are raised to the caller.
+        """
+        summary = SecdefSummary(dbname)
+        classes = {}  # owner -> owner class
+        cursor.execute(SECDEF_QUERY)
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            detail = []
+            for schema, func, args, owner, rolsuper, member_of in rows:
+                if owner not in classes:
+                    classes[owner] = owner_class(rolsuper, owner, set(member_of or ()), self.trusted_roles)
+                summary.counts[(schema, owner, classes[owner])] += 1
+                detail.append((dbname, schema, func, args, owner, classes[owner]))
+            summary.scanned += len(rows)
+            self._write(detail)
+        return summary
+
+    def close(self):
+        """Closes the detail file; the next row written starts a new file at self.path."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = self._writer = None
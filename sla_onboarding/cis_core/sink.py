@@ -0,0 +1,252 @@
+"""Buffered result sink shared by the CIS checkers.
+
+Every report line goes through one ResultSink, which prints it to the console
+and writes it to the report file through a single buffered handle (instead of
+reopening the file for every line). Check outcomes are recorded as typed
+CheckResult records; the Expected/Actual/Status lines of the report are
+rendered from those same records.
+
+Checks that run on worker threads write into a per-thread capture buffer
+(see ResultSink.capture); the scheduler replays the buffers in registry order,
+so the report is identical whatever order the checks actually finished in.
+
+Every result also updates the sink's ComplianceTally (status counts and
+scores, see cis_core.scoring), so the summary needs no pass over the report.
+
+Optionally every result is also emitted as one NDJSON record (see
+open_ndjson) for harnesses that want machine-readable output.
+
+With a TimeBudget attached (sink.budget, see cis_core.deadline), each check
+gets a deadline when it begins; remaining() tells the shell/SQL primitives how
+long they may still take, and results recorded after a check hit a timeout or
+past its deadline get the TIMEOUT status.
+"""
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from cis_core.scoring import ComplianceTally
+
+DEFAULT_FLUSH_THRESHOLD = 50  # lines written before the handle is flushed to disk
+
+CheckResult = namedtuple('CheckResult', [
+    'check_id',   # e.g. '3.1.2', None for lines outside a check
+    'section',    # e.g. 'Section 3: Logging And Auditing'
+    'title',      # check title as shown in the report header
+    'item',       # variable / path / sub-item the status applies to, if any
+    'expected',
+    'actual',
+    'status',     # PASS, FAIL, NA, MANUAL, TIMEOUT
+    'duration',   # seconds spent since the check (or its previous result) started
+    'note',       # short remark rendered after the status, e.g. 'Manual Review Recommended'
+])
+
+
+class ResultSink:
+    """Collects report lines and CheckResult records for one report file."""
+
+    def __init__(self, path, flush_threshold=DEFAULT_FLUSH_THRESHOLD, echo=True):
+        self.path = path
+        self.flush_threshold = flush_threshold
+        self.echo = echo
+        self.results = []
+        self.tally = ComplianceTally()  # status counts and scores of self.results, kept as they are added
+        self._handle = None
+        self._unflushed = 0
+        self.ndjson = None          # stream receiving one JSON record per result
+        self.ndjson_labels = {}     # extra keys added to every record, e.g. {'target': 'db1'}
+        self._owns_ndjson = False
+        self.budget = None          # TimeBudget giving each check a deadline, or None for no limits
+        self.session_timeout = None # SessionTimeout re-issuing the statement timeout per check, or None
+        self._lock = threading.Lock()
+        # Current section/check, timing mark and capture buffer are per thread
+        self._local = threading.local()
+        atexit.register(self.close)
+
+    def _state(self):
+        local = self._local
+        if not hasattr(local, 'mark'):
+            local.section = None
+            local.check_id = None
+            local.title = None
+            local.mark = time.monotonic()
+            local.buffer = None
+            local.deadline = None
+            local.timed_out = None
+        return local
+
+    @contextmanager
+    def capture(self, section=None):
+        """Buffers the current thread's lines and results instead of writing them.
+
+        Yields the buffer (a list of ('line', text) / ('result', CheckResult)
+        entries, plus a ('nocache', None) marker, see mark_uncacheable) to be
+        handed to replay() later.
+        """
+        state = self._state()
+        saved = (state.buffer, state.section)
+        state.buffer = []
+        state.section = section
+        try:
+            yield state.buffer
+        finally:
+            state.buffer, state.section = saved
+
+    def replay(self, buffer):
+        """Writes a captured buffer to the report, in the order it was captured."""
+        for kind, entry in buffer:
+            if kind == 'result':
+                self._add_result(entry)
+            elif kind == 'line':
+                self.write(entry)
+
+    def open_ndjson(self, path):
+        """Emits every result as an NDJSON record to path ('-' for stdout).
+
+        When the records go to stdout, the text report is no longer echoed to the
+        console so stdout stays machine-readable; the report file is unchanged.
+        """
+        if path == '-':
+            self.ndjson = sys.stdout
+            self.echo = False
+        else:
+            self.ndjson = open(path, 'w', encoding='utf-8')
+            self._owns_ndjson = True
+
+    def _add_result(self, result):
+        with self._lock:
+            self.results.append(result)
+            self.tally.add(result)
+            if self.ndjson is not None:
+                record = dict(self.ndjson_labels)
+                record.update({
+                    'id': result.check_id,
+                    'title': result.title,
+                    'section': result.section,
+                    'item': result.item,
+                    'status': result.status,
+                    'note': result.note,
+                    'expected': result.expected,
+                    'actual': result.actual,
+                    'duration_ms': round(result.duration * 1000, 1),
+                })
+                self.ndjson.write(json.dumps(record, default=str) + '\n')
+
+    def write(self, line):
+        """Prints a line and appends it to the report file buffer."""
+        state = self._state()
+        if state.buffer is not None:
+            state.buffer.append(('line', line))
+            return
+        with self._lock:
+            self._write(line)
+
+    def _write(self, line):
+        if self.echo:
+            print(line)
+        if self._handle is None:
+            self._handle = open(self.path, 'a', encoding='utf-8')
+        self._handle.write(line + '\n')
+        self._unflushed += 1
+        if self._unflushed >= self.flush_threshold:
+            self.flush()
+
+    def begin_section(self, title):
+        """Starts a report section, e.g. 'Section 3: Logging And Auditing'."""
+        state = self._state()
+        state.section = title
+        state.check_id = None
+        state.title = None
+        self.write(f"\n{title}")
+
+    def begin_check(self, check_id, title):
+        """Starts a check and writes its '[id] title' header."""
+        state = self._state()
+        state.check_id = check_id
+        state.title = title
+        state.mark = time.monotonic()
+        state.deadline = self.budget.deadline_for(check_id, state.mark) if self.budget else None
+        state.timed_out = None
+        if self.session_timeout is not None:
+            self.session_timeout.begin_check(check_id)
+        self.write(f"\n[{check_id}] {title}")
+
+    def remaining(self):
+        """Seconds left for the current thread's check (the run deadline outside checks), or None without limits."""
+        state = self._state()
+        if state.deadline is not None:
+            return state.deadline - time.monotonic()
+        return self.budget.run_remaining() if self.budget else None
+
+    def before_statement(self):
+        """Called before the current check's SQL; lets the SessionTimeout re-issue the statement timeout."""
+        if self.session_timeout is not None:
+            self.session_timeout.before_statement()
+
+    def mark_uncacheable(self):
+        """Notes that the current check's outcome came from a read or scan error, so it must not be cached."""
+        state = self._state()
+        if state.buffer is not None and ('nocache', None) not in state.buffer:
+            state.buffer.append(('nocache', None))
+
+    def mark_timed_out(self, reason):
+        """Notes that the current check hit a timeout; its further results are recorded as TIMEOUT."""
+        state = self._state()
+        if state.timed_out is None:
+            state.timed_out = reason
+
+    def timed_out(self):
+        """Why the current thread's check timed out, or None."""
+        return self._state().timed_out
+
+    def record(self, status, expected=None, actual=None, item=None, note=None, duration=None):
+        """Records a check outcome and renders its Expected/Actual/Status lines.
+
+        duration overrides the time measured since the check (or its previous result) started.
+        """
+        state = self._state()
+        now = time.monotonic()
+        if state.timed_out is None and state.deadline is not None and now > state.deadline:
+            state.timed_out = "ran past its time budget"
+        if state.timed_out is not None and status != 'TIMEOUT':
+            # What the check concluded after a command or query was cut off is not reliable
+            status, note = 'TIMEOUT', f"{state.timed_out}; would have been {status}" + (f" ({note})" if note else "")
+        result = CheckResult(state.check_id, state.section, state.title, item, expected, actual, status,
+                             now - state.mark if duration is None else duration, note)
+        state.mark = now
+        if state.buffer is not None:
+            state.buffer.append(('result', result))
+        else:
+            self._add_result(result)
+        if expected is not None:
+            self.write(f"  Expected: {expected}")
+        if actual is not None:
+            self.write(f"  Actual:   {actual}")
+        self.write(f"  Status:   {status}" + (f" ({note})" if note else ""))
+        return result
+
+    def flush(self):
+        """Flushes buffered lines to the report file."""
+        if self._handle is not None:
+            self._handle.flush()
+        if self.ndjson is not None:
+            self.ndjson.flush()
+        self._unflushed = 0
+
+    def close(self):
+        """Flushes and closes the report file. Safe to call more than once."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self.ndjson is not None:
+            if self._owns_ndjson:
+                self.ndjson.close()
+            else:
+                self.ndjson.flush()
+            self.ndjson = None
+            self._owns_ndjson = False
+        self._unflushed = 0
@@ -41,13 +41,24 @@ pg_cis_compliance_check() {
     echo "This may take several minutes to complete..."
     
     local cis_output_file=""
+    local cis_ndjson_file=""
     local cis_exit_code=0
+    local cis_summary_file
+    cis_summary_file=$(mktemp "${TMPDIR:-/tmp}/cis_summary.XXXXXX")
+    # The checker tallies its results as it runs and writes the counts, scores
+    # and the exact paths of its report files to the summary file
+    local cis_args=(--summary "$cis_summary_file")
+    
+    # With jq available, ask for per-check NDJSON records instead of parsing the text report
+    if command -v jq >/dev/null 2>&1; then
+        cis_args+=(--ndjson "${CIS_OUTPUT_PREFIX}_$(date +%Y%m%d_%H%M%S).ndjson")
+    fi
     
-    if cd "$script_dir" && python3 "$CIS_SCRIPT_NAME" 2>/dev/null; then
+    if cd "$script_dir" && python3 "$CIS_SCRIPT_NAME" "${cis_args[@]}" 2>/dev/null; then
         cis_exit_code=0
-        # Find the most recent CIS output file
-        cis_output_file=$(ls -t ${CIS_OUTPUT_PREFIX}_*.txt 2>/dev/null | head -1)
-        if [ -n "$cis_output_file" ]; then
+        cis_output_file=$(cis_summary_value "$cis_summary_file" report_file)
+        cis_ndjson_file=$(cis_summary_value "$cis_summary_file" ndjson_file)
+        if [ -n "$cis_output_file" ] && [ -f "$cis_output_file" ]; then
             echo "CIS Compliance|Assessment completed successfully"
             echo "CIS Output File|$cis_output_file"
             cis_passed=true
@@ -61,18 +72,40 @@ pg_cis_compliance_check() {
     
     # Parse and integrate CIS results
     if [ "$cis_passed" = true ] && [ -n "$cis_output_file" ]; then
+        local cis_results_file="$cis_output_file"
+        if [ -n "$cis_ndjson_file" ] && [ -s "$cis_ndjson_file" ]; then
+            cis_results_file="$cis_ndjson_file"
+            echo "CIS Results File|$cis_ndjson_file"
+        fi
+        
         echo "--- CIS Compliance Results ---"
-        parse_cis_output "$script_dir/$cis_output_file"
+        parse_cis_output "$cis_results_file"
         
         # Generate compliance summary
         echo "--- CIS Compliance Summary ---"
-        generate_cis_summary "$script_dir/$cis_output_file"
+        generate_cis_summary "$cis_summary_file"
     fi
+    rm -f "$cis_summary_file"
     
     echo ""
     return 0
 }
 
+# Print the value of a key of a CIS checker --summary file
+cis_summary_value() {
+    local cis_summary_file="$1"
+    local wanted="$2"
+    local key value
+    
+    while IFS='=' read -r key value; do
+        if [ "$key" = "$wanted" ]; then
+            echo "$value"
+            return 0
+        fi
+    done < "$cis_summary_file"
+    return 1
+}
+
 # Validate CIS prerequisites
 validate_cis_prerequisites() {
     local all_good=true
@@ -254,6 +287,20 @@ EOF
     return 0
 }
 
+# Parse CIS NDJSON records (one per check result) in a single jq pass
+parse_cis_ndjson() {
+    local cis_ndjson_file="$1"
+    
+    jq -r '
+        . as $r
+        | select($r.id != null)
+        | ($r.actual // empty | tostring | split("\n")[0] | select(length < 100) | "CIS Finding|\($r.id): \(.)"),
+          ({"PASS": "✓ PASSED", "FAIL": "✗ FAILED", "NA": "~ N/A", "TIMEOUT": "⏱ TIMEOUT"}[$r.status] // empty
+           | "CIS Security Check|\(.): CIS \($r.id)"
+             + (if $r.title then ": " + ($r.title | gsub(" \\((Automated|Manual)\\)"; "")) else "" end))
+    ' "$cis_ndjson_file"
+}
+
 # Parse CIS output and convert to our standard format
 parse_cis_output() {
     local cis_output_file="$1"
@@ -263,6 +310,11 @@ parse_cis_output() {
         return 1
     fi
     
+    if [[ "$cis_output_file" == *.ndjson ]]; then
+        parse_cis_ndjson "$cis_output_file"
+        return
+    fi
+    
     local current_section=""
     local check_id=""
     local check_description=""
@@ -281,6 +333,12 @@ parse_cis_output() {
             continue
         fi
         
+        # Timed-out checks carry a note, e.g. "Status:   TIMEOUT (command timed out after 60.0s)"
+        if [[ "$line" =~ ^[[:space:]]*Status:[[:space:]]+TIMEOUT ]]; then
+            echo "CIS Security Check|⏱ TIMEOUT: CIS $check_id: $(echo "$check_description" | sed 's/ (Automated)//' | sed 's/ (Manual)//')"
+            continue
+        fi
+
         # Parse check results
         if [[ "$line" =~ ^[[:space:]]*Status:[[:space:]]+(PASS|FAIL|NA)$ ]]; then
             local status="${BASH_REMATCH[1]}"
@@ -313,38 +371,57 @@ parse_cis_output() {
     done < "$cis_output_file"
 }
 
-# Generate CIS compliance summary
+# Generate CIS compliance summary from the counts and scores in a checker's --summary file
 generate_cis_summary() {
-    local cis_output_file="$1"
+    local cis_summary_file="$1"
     
-    if [ ! -f "$cis_output_file" ]; then
-        echo "CIS Summary|Unable to generate summary - output file not found"
+    if [ ! -s "$cis_summary_file" ]; then
+        echo "CIS Summary|Unable to generate summary - summary file not found"
         return 1
     fi
     
-    # Count results
-    local total_checks=$(grep -c "Status:[[:space:]]*\(PASS\|FAIL\|NA\)" "$cis_output_file" 2>/dev/null || echo 0)
-    local passed_checks=$(grep -c "Status:[[:space:]]*PASS" "$cis_output_file" 2>/dev/null || echo 0)
-    local failed_checks=$(grep -c "Status:[[:space:]]*FAIL" "$cis_output_file" 2>/dev/null || echo 0)
-    local na_checks=$(grep -c "Status:[[:space:]]*NA" "$cis_output_file" 2>/dev/null || echo 0)
-    
-    # Calculate compliance percentage
-    local compliance_percentage=0
-    if [ "$total_checks" -gt 0 ]; then
-        # Calculate percentage of passed checks out of applicable checks (PASS + FAIL)
-        local applicable_checks=$((passed_checks + failed_checks))
-        if [ "$applicable_checks" -gt 0 ]; then
-            compliance_percentage=$((passed_checks * 100 / applicable_checks))
-        fi
-    fi
+    local total_checks=0 passed_checks=0 failed_checks=0 na_checks=0 timeout_checks=0
+    local compliance_percentage=0 weighted_score=""
+    local sections=()
+    local key value
+    while IFS='=' read -r key value; do
+        case "$key" in
+            total) total_checks="$value" ;;
+            passed) passed_checks="$value" ;;
+            failed) failed_checks="$value" ;;
+            na) na_checks="$value" ;;
+            timeout) timeout_checks="$value" ;;
+            score) compliance_percentage="$value" ;;
+            weighted_score) weighted_score="$value" ;;
+            section) sections+=("$value") ;;
+        esac
+    done < "$cis_summary_file"
+    # Percentage of passed checks out of applicable checks (PASS + FAIL + TIMEOUT: a timed out check did not pass)
+    local applicable_checks=$((passed_checks + failed_checks + timeout_checks))
     
     # Generate summary
     echo "CIS Total Checks|$total_checks security checks performed"
     echo "CIS Passed Checks|$passed_checks checks passed"
     echo "CIS Failed Checks|$failed_checks checks failed"
     echo "CIS N/A Checks|$na_checks checks not applicable"
+    if [ "$timeout_checks" -gt 0 ]; then
+        echo "CIS Timed Out Checks|$timeout_checks checks timed out"
+    fi
     echo "CIS Compliance Score|${compliance_percentage}% (${passed_checks}/${applicable_checks} applicable checks)"
     
+    local section title section_passed section_failed section_na section_timeout section_score
+    for section in ${sections[@]+"${sections[@]}"}; do
+        IFS=$'\t' read -r title section_passed section_failed section_na section_timeout section_score <<< "$section"
+        if [ -n "$section_score" ]; then
+            echo "CIS Section Score|$title: ${section_score}% (${section_passed}/$((section_passed + section_failed + section_timeout)) applicable checks)"
+        else
+            echo "CIS Section Score|$title: no applicable checks"
+        fi
+    done
+    if [ -n "$weighted_score" ]; then
+        echo "CIS Weighted Score|${weighted_score}% (section scores weighted per the [scoring] config section)"
+    fi
+    
     # Determine compliance level
     local compliance_level="POOR"
     if [ "$compliance_percentage" -ge 90 ]; then
@@ -14,6 +14,14 @@ fi
 FORMAT="txt"
 OUTPUT_FILE=""
 REPORT=()
+# Report collection: "spool" (section output piped to report_renderer.py --collect)
+# or "echo" (legacy: echo overridden to append to REPORT)
+COLLECT_MODE="${COLLECT_MODE:-spool}"
+SPOOL_DIR=""
+SPOOL_FILE=""
+COLLECTOR_PID=""
+# Number of section groups (OS, PostgreSQL, MySQL, MariaDB) run concurrently; 1 runs them in turn
+PARALLEL_JOBS="${PARALLEL_JOBS:-1}"
 
 # =============================================================================
 # CUSTOMIZABLE PATH VARIABLES - Modify these for your environment
@@ -87,6 +95,9 @@ Usage: $0 [OPTIONS]
   --interactive      Interactive mode with guided execution
   --format=FORMAT    Output format: txt, csv, json (default: txt)
   --output=FILE      Write output to file instead of stdout
+  --collect=MODE     Report collection: spool, echo (default: spool)
+  --jobs=N           Run up to N section groups (OS, PostgreSQL, MySQL, MariaDB)
+                     concurrently (default: 1)
   --test-cis         Test CIS integration prerequisites
   -h, --help         Show this help
 
@@ -107,6 +118,7 @@ Examples:
   $0 --interactive                    # Guided assessment for Service Desk
   $0 --postgres --format=json        # PostgreSQL assessment with CIS checks
   $0 --all --output=report.json      # Complete assessment including CIS
+  $0 --all --jobs=4                  # All section groups at once
   $0 --test-cis                      # Test CIS integration setup
 USAGE
 }
@@ -348,6 +360,136 @@ test_mariadb_connectivity() {
   fi
 }
 
+# Sections run for each option, in report order
+OS_SECTIONS=(
+  os_summary os_security os_storage os_services os_patches
+  system_performance_metrics system_security_assessment os_monitoring_discovery
+)
+PG_SECTIONS=(
+  pg_summary pg_config_files pg_extensions pg_users_databases pg_backup_config pg_memory pg_disk
+  pg_replication pg_logs pg_db_sizes pg_performance_metrics pg_backup_validation
+  pg_security_assessment pg_cis_compliance_check
+)
+MYSQL_SECTIONS=(
+  mysql_summary mysql_get_paths mysql_users_security mysql_replication mysql_config_files
+  mysql_storage_engines mysql_memory mysql_show_config mysql_db_sizes mysql_innodb_status
+  mysql_performance_metrics mysql_backup_validation mysql_security_assessment mysql_cis_compliance_check
+)
+MARIADB_SECTIONS=(
+  mariadb_summary mariadb_get_paths mariadb_cluster_status mariadb_plugins mariadb_config_files
+  mariadb_users_security mariadb_memory mariadb_show_config mariadb_db_sizes mariadb_innodb_status
+  mariadb_performance_metrics mariadb_backup_validation mariadb_security_assessment mariadb_cis_compliance_check
+)
+
+# Spool collection: one collector process appends every line written to fd 3 to
+# $SPOOL_FILE, tagged with the current section and a timestamp. Sections run in
+# this shell with stdout on fd 3, so variables they set stay visible and the
+# output of subshells and external tools is collected too.
+create_spool_dir() {
+  SPOOL_DIR=$(mktemp -d "${TMPDIR:-/tmp}/sla_report.XXXXXX")
+  SPOOL_FILE="$SPOOL_DIR/report.spool"
+  trap 'rm -rf "$SPOOL_DIR"' EXIT
+}
+
+start_collector() {
+  create_spool_dir
+  mkfifo "$SPOOL_DIR/collect.fifo"
+  python3 "$SCRIPT_DIR/report_renderer.py" --collect > "$SPOOL_FILE" < "$SPOOL_DIR/collect.fifo" &
+  COLLECTOR_PID=$!
+  exec 3> "$SPOOL_DIR/collect.fifo"
+}
+
+# Close the pipe and wait until the collector has written everything to the spool
+stop_collector() {
+  exec 3>&-
+  wait "$COLLECTOR_PID"
+}
+
+# Run check functions, collecting their output
+run_sections() {
+  local section
+  for section in "$@"; do
+    if [ "$COLLECT_MODE" = "spool" ]; then
+      printf '\036%s\n' "$section" >&3   # section mark, see report_renderer.SECTION_MARK
+      "$section" >&3
+    else
+      "$section"
+    fi
+  done
+}
+
+# Run the sections of one group (the name of one of the *_SECTIONS arrays) in a
+# subshell, buffering its output in file $2: spool records from a collector of
+# its own, or in echo mode the group's REPORT lines, NUL-separated. Variables
+# set by the sections do not leave the group.
+run_group() {
+  local sections_ref="$1[@]"
+  local buffer="$2"
+
+  if [ "$COLLECT_MODE" = "spool" ]; then
+    ( exec 3>&1; run_sections "${!sections_ref}" ) |
+      python3 "$SCRIPT_DIR/report_renderer.py" --collect > "$buffer"
+  else
+    (
+      REPORT=()
+      override_echo
+      run_sections "${!sections_ref}"
+      restore_echo
+      if [ ${#REPORT[@]} -gt 0 ]; then
+        printf '%s\0' "${REPORT[@]}"
+      fi > "$buffer"
+    )
+  fi
+}
+
+# Number of the given processes still running
+count_running() {
+  local pid running=0
+  for pid in "$@"; do
+    if kill -0 "$pid" 2>/dev/null; then
+      running=$((running + 1))
+    fi
+  done
+  echo "$running"
+}
+
+# Run the given section groups with up to PARALLEL_JOBS of them at a time, then
+# merge their buffers into the spool (or REPORT) in the order given, so the
+# report and the SLA assessment do not depend on which group finished first.
+# Fails with the status of the last failing group, as a sequential run would.
+run_groups_parallel() {
+  local groups=("$@")
+  local pids=()
+  local i line status=0
+
+  create_spool_dir
+  for i in "${!groups[@]}"; do
+    while [ "$(count_running ${pids[@]+"${pids[@]}"})" -ge "$PARALLEL_JOBS" ]; do
+      sleep 0.1
+    done
+    run_group "${groups[$i]}" "$SPOOL_DIR/group_$i" &
+    pids+=($!)
+  done
+
+  if [ "$COLLECT_MODE" = "spool" ]; then
+    : > "$SPOOL_FILE"
+  fi
+  for i in "${!groups[@]}"; do
+    wait "${pids[$i]}" || status=$?
+    if [ ! -f "$SPOOL_DIR/group_$i" ]; then
+      continue
+    fi
+    if [ "$COLLECT_MODE" = "spool" ]; then
+      cat "$SPOOL_DIR/group_$i" >> "$SPOOL_FILE"
+    else
+      while IFS= read -r -d '' line; do
+        REPORT+=("$line")
+      done < "$SPOOL_DIR/group_$i"
+    fi
+  done
+  return $status
+}
+
 # Override echo to collect output
 collect() {
   REPORT+=("$1")
@@ -355,9 +497,7 @@ collect() {
 
 # Replace echo with collect in all the check scripts
 override_echo() {
-  # Save original echo function
-  eval "original_echo() { $(declare -f echo); }"
-  # Override echo to use collect
+  # Override the echo builtin to use collect
   echo() {
     collect "$*"
   }
@@ -365,9 +505,8 @@ override_echo() {
 
 # Restore original echo behavior
 restore_echo() {
-  # Restore original echo function
-  eval "echo() { $(declare -f original_echo | sed 's/^original_echo/echo/'); }"
-  unset -f original_echo
+  # Dropping the function makes echo the builtin again
+  unset -f echo
 }
 
 # Parse arguments
@@ -393,6 +532,8 @@ while [[ $# -gt 0 ]]; do
     --test-cis) test_cis_integration; exit $? ;;
     --format=*) FORMAT="${1#*=}"; shift ;;
     --output=*) OUTPUT_FILE="${1#*=}"; shift ;;
+    --collect=*) COLLECT_MODE="${1#*=}"; shift ;;
+    --jobs=*) PARALLEL_JOBS="${1#*=}"; shift ;;
     -h|--help) usage; exit 0 ;;
     *) echo "Unknown option: $1"; usage; exit 1 ;;
   esac
@@ -409,174 +550,100 @@ if [[ ! "$FORMAT" =~ ^(txt|csv|json)$ ]]; then
   exit 1
 fi
 
-# Override echo to collect output
-override_echo
+# Validate collection mode
+if [[ ! "$COLLECT_MODE" =~ ^(spool|echo)$ ]]; then
+  echo "Error: Invalid collection mode. Supported modes: spool, echo"
+  exit 1
+fi
+if [ "$COLLECT_MODE" = "spool" ] && ! command -v python3 >/dev/null 2>&1; then
+  echo "Warning: python3 not found, collecting the report with --collect=echo" >&2
+  COLLECT_MODE="echo"
+fi
 
-# Run selected checks
+# Validate parallel jobs
+if [[ ! "$PARALLEL_JOBS" =~ ^[1-9][0-9]*$ ]]; then
+  echo "Error: Invalid number of jobs. Use a positive integer"
+  exit 1
+fi
+
+# Selected section groups, in report order
+SECTION_GROUPS=()
 if $run_os; then
-  os_summary
-  os_security
-  os_storage
-  os_services
-  os_patches
-  system_performance_metrics
-  system_security_assessment
-  os_monitoring_discovery
+  SECTION_GROUPS+=(OS_SECTIONS)
 fi
 if $run_postgres; then
-  pg_summary
-  pg_config_files
-  pg_extensions
-  pg_users_databases
-  pg_backup_config
-  pg_memory
-  pg_disk
-  pg_replication
-  pg_logs
-  pg_db_sizes
-  pg_performance_metrics
-  pg_backup_validation
-  pg_security_assessment
-  pg_cis_compliance_check
+  SECTION_GROUPS+=(PG_SECTIONS)
 fi
 if $run_mysql; then
-  mysql_summary
-  mysql_get_paths
-  mysql_users_security
-  mysql_replication
-  mysql_config_files
-  mysql_storage_engines
-  mysql_memory
-  mysql_show_config
-  mysql_db_sizes
-  mysql_innodb_status
-  mysql_performance_metrics
-  mysql_backup_validation
-  mysql_security_assessment
-  mysql_cis_compliance_check
+  SECTION_GROUPS+=(MYSQL_SECTIONS)
 fi
 if $run_mariadb; then
-  mariadb_summary
-  mariadb_get_paths
-  mariadb_cluster_status
-  mariadb_plugins
-  mariadb_config_files
-  mariadb_users_security
-  mariadb_memory
-  mariadb_show_config
-  mariadb_db_sizes
-  mariadb_innodb_status
-  mariadb_performance_metrics
-  mariadb_backup_validation
-  mariadb_security_assessment
-  mariadb_cis_compliance_check
+  SECTION_GROUPS+=(MARIADB_SECTIONS)
 fi
 
-# Restore original echo function
-restore_echo
+if [ "$PARALLEL_JOBS" -gt 1 ] && [ ${#SECTION_GROUPS[@]} -gt 1 ]; then
+  # Groups run concurrently, each buffering its own output
+  run_groups_parallel "${SECTION_GROUPS[@]}"
+else
+  # Collect output: spool collector, or echo overridden to append to REPORT
+  if [ "$COLLECT_MODE" = "spool" ]; then
+    start_collector
+  else
+    override_echo
+  fi
+
+  # Run selected checks
+  for group in ${SECTION_GROUPS[@]+"${SECTION_GROUPS[@]}"}; do
+    group_sections="$group[@]"
+    run_sections "${!group_sections}"
+  done
+
+  # Stop collecting
+  if [ "$COLLECT_MODE" = "spool" ]; then
+    stop_collector
+  else
+    restore_echo
+  fi
+fi
 
 # Generate output in requested format
+# report_renderer.py streams the spool (or REPORT, NUL-separated on stdin) into txt, csv or json
+# with proper escaping and writes it to --output or stdout
 output_result() {
-  local result=""
   local raw_report_data=""
-  
-  # Combine all report data for SLA analysis
-  for line in "${REPORT[@]}"; do
-    raw_report_data+="$line\n"
-  done
-  
+  local sla_format="text"
+  local renderer_args=(--format "$FORMAT")
+
+  # Combine all report data for SLA analysis ("\n"-joined, as the SLA templates expect)
+  if [ "$COLLECT_MODE" = "spool" ]; then
+    raw_report_data=$(python3 "$SCRIPT_DIR/report_renderer.py" --sla-data --spool "$SPOOL_FILE")
+    renderer_args+=(--spool "$SPOOL_FILE")
+  elif [ ${#REPORT[@]} -gt 0 ]; then
+    raw_report_data=$(printf '%s\\n' "${REPORT[@]}")
+  fi
   case "$FORMAT" in
-    json)
-      # Create JSON representation with SLA assessment
-      local sla_json=$(generate_sla_report "$raw_report_data" "json")
-      
-      result="{\n"
-      result+="  \"timestamp\": \"$(date -Iseconds)\",\n"
-      result+="  \"hostname\": \"$(hostname)\",\n"
-      
-      # Add SLA assessment section
-      result+="  \"sla_assessment\": $(echo "$sla_json" | jq '.sla_assessment' 2>/dev/null || echo '{}'),\n"
-      
-      result+="  \"technical_checks\": [\n"
-      
-      local first=true
-      for line in "${REPORT[@]}"; do
-        if [ "$first" = true ]; then
-          first=false
-        else
-          result+=",\n"
-        fi
-        # Escape any quotes in the line
-        line="${line//\"/\\\"}"
-        result+="    \"$line\""
-      done
-      
-      result+="\n  ]\n"
-      result+="}\n"
-      ;;
-    
-    csv)
-      # Create CSV representation with SLA info
-      result="Timestamp,Hostname,Check,Value\n"
-      local timestamp=$(date -Iseconds)
-      local hostname=$(hostname)
-      
-      # Add SLA assessment as CSV rows
-      local sla_csv=$(generate_sla_report "$raw_report_data" "csv")
-      result+="$sla_csv\n"
-      result+="\n# Technical Checks\n"
-      
-      for line in "${REPORT[@]}"; do
-        # Split at first colon or pipe if exists
-        if [[ "$line" == *":"* ]]; then
-          local check="${line%%:*}"
-          local value="${line#*: }"
-          # Escape any commas and quotes
-          check="${check//,/\\,}"
-          check="${check//\"/\\\"}"
-          value="${value//,/\\,}"
-          value="${value//\"/\\\"}"
-          result+="$timestamp,$hostname,\"$check\",\"$value\"\n"
-        elif [[ "$line" == *"|"* ]]; then
-          local check="${line%%|*}"
-          local value="${line#*| }"
-          # Escape any commas and quotes
-          check="${check//,/\\,}"
-          check="${check//\"/\\\"}"
-          value="${value//,/\\,}"
-          value="${value//\"/\\\"}"
-          result+="$timestamp,$hostname,\"$check\",\"$value\"\n"
-        else
-          # Just use the whole line as the check
-          local check="${line//,/\\,}"
-          check="${check//\"/\\\"}"
-          result+="$timestamp,$hostname,\"$check\",\"\"\n"
-        fi
-      done
-      ;;
-    
-    txt|*)
-      # Plain text with SLA assessment
-      local sla_text=$(generate_sla_report "$raw_report_data" "text")
-      result+="$sla_text\n\n"
-      
-      result+="=================================================================\n"
-      result+="                    TECHNICAL ASSESSMENT\n"
-      result+="=================================================================\n\n"
-      
-      for line in "${REPORT[@]}"; do
-        result+="$line\n"
-      done
-      ;;
+    json|csv) sla_format="$FORMAT" ;;
   esac
-  
-  # Output to file or stdout
   if [ -n "$OUTPUT_FILE" ]; then
-    echo -e "$result" > "$OUTPUT_FILE"
-    echo "Output written to $OUTPUT_FILE"
-  else
-    echo -e "$result"
+    renderer_args+=(--output "$OUTPUT_FILE")
   fi
+
+  if ! command -v python3 >/dev/null 2>&1; then
+    echo "Warning: python3 not found, writing the plain text report" >&2
+    if [ -n "$OUTPUT_FILE" ]; then
+      { generate_sla_report "$raw_report_data" "text"; echo; printf '%s\n' ${REPORT[@]+"${REPORT[@]}"}; } > "$OUTPUT_FILE"
+      echo "Output written to $OUTPUT_FILE"
+    else
+      generate_sla_report "$raw_report_data" "text"; echo; printf '%s\n' ${REPORT[@]+"${REPORT[@]}"}
+    fi
+    return
+  fi
+
+  # In echo mode, REPORT goes to the renderer NUL-separated on stdin
+  if [ "$COLLECT_MODE" = "echo" ] && [ ${#REPORT[@]} -gt 0 ]; then
+    printf '%s\0' "${REPORT[@]}"
+  fi | python3 "$SCRIPT_DIR/report_renderer.py" "${renderer_args[@]}" \
+         --sla <(generate_sla_report "$raw_report_data" "$sla_format")
 }
 
 output_result
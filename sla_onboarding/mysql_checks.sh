@@ -263,13 +263,16 @@ mysql_cis_compliance_check() {
     # but avoid infinite recursion. Use a bypass approach.
     echo "CIS Compliance|Calling MySQL CIS integration..."
     local script_dir="$(dirname "$0")"
-    cd "$script_dir" && python3 mysql80_CIS_checks.py 2>/dev/null && {
+    # The checker writes the exact path of its report to the summary file
+    local cis_summary_file=$(mktemp "${TMPDIR:-/tmp}/cis_summary.XXXXXX")
+    cd "$script_dir" && python3 mysql80_CIS_checks.py --summary "$cis_summary_file" 2>/dev/null && {
       echo "CIS Compliance|MySQL CIS assessment completed"
-      local cis_output_file=$(ls -t mysql80_cis_check_*.txt 2>/dev/null | head -1)
+      local cis_output_file=$(cis_summary_value "$cis_summary_file" report_file)
       if [ -n "$cis_output_file" ]; then
         echo "CIS Output File|$cis_output_file"
       fi
     } || echo "CIS Compliance|MySQL CIS assessment failed - check prerequisites"
+    rm -f "$cis_summary_file"
   else
     echo "CIS Compliance|MySQL CIS integration not available"
     echo "CIS Compliance|Install prerequisites and ensure mysql80_CIS_checks.py is present"
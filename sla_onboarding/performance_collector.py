@@ -0,0 +1,281 @@
+"""Collects the database performance metrics of performance_metrics.sh over one connection.
+
+pg_performance_metrics used to start a psql process (fork, connect,
+authenticate) for each of its eight metrics, and the MySQL and MariaDB
+variants did the same with their client, so the metrics phase took seconds.
+This script opens one connection per engine and reads everything in one
+round trip where the server allows it: a single multi-CTE query on
+PostgreSQL, SHOW GLOBAL STATUS plus one PROCESSLIST query on MySQL/MariaDB
+(and the digest summary and replica status on MySQL). It prints the same
+'--- Section ---' headers and 'Name|Value' lines as the shell functions, so
+sla_templates.sh reads the report unchanged, and prints nothing unless every
+metric was collected: performance_metrics.sh then falls back to the client
+tools.
+
+Exit codes: 0 metrics printed, 1 no connection or a query failed, 2 no driver.
+"""
+import argparse
+import configparser
+import os
+import sys
+
+from cis_core.drivers import load_mysql_driver, load_postgres_driver
+
+ENGINES = ('postgres', 'mysql', 'mariadb')
+CONFIG_SECTIONS = {'postgres': 'postgresql', 'mysql': 'mysql', 'mariadb': 'mariadb'}
+CONNECT_TIMEOUT = 5       # seconds, per connection attempt
+STATEMENT_TIMEOUT = 15    # seconds, per statement (the old per-metric client timeout)
+MYSQL_SOCKETS = ('/var/run/mysqld/mysqld.sock', '/run/mysqld/mysqld.sock', '/var/lib/mysql/mysql.sock',
+                 '/tmp/mysql.sock')
+
+PG_METRICS_QUERY = """
+    WITH activity AS (
+        SELECT count(*) FILTER (WHERE state = 'active') AS active,
+               count(*) AS total,
+               count(*) FILTER (WHERE state = 'active'
+                                  AND now() - query_start > interval '5 minutes') AS long_running
+        FROM pg_stat_activity
+    ), top_wait AS (
+        SELECT coalesce(wait_event, 'CPU') || ' (' || count(*) || ' sessions)' AS event
+        FROM pg_stat_activity
+        WHERE state = 'active'
+        GROUP BY wait_event
+        ORDER BY count(*) DESC
+        LIMIT 1
+    ), busiest AS (
+        SELECT datname || ' (' || (xact_commit + xact_rollback) || ' transactions)' AS db
+        FROM pg_stat_database
+        WHERE datname NOT IN ('template0', 'template1')
+        ORDER BY xact_commit + xact_rollback DESC
+        LIMIT 1
+    ), cache AS (
+        SELECT round(100.0 * sum(blks_hit) / sum(blks_hit + blks_read), 2) AS hit_ratio
+        FROM pg_stat_database
+        WHERE blks_read > 0
+    )
+    SELECT a.active, a.total, current_setting('max_connections'), a.long_running,
+           (SELECT event FROM top_wait), (SELECT db FROM busiest),
+           (SELECT count(*) FROM pg_stat_replication) > 0 OR pg_is_in_recovery() AS replicating,
+           CASE WHEN NOT pg_is_in_recovery()
+                THEN (SELECT max(extract(epoch FROM replay_lag))::text || ' seconds' FROM pg_stat_replication)
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 'Up to date'
+                ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())::text || ' seconds'
+           END AS lag,
+           c.hit_ratio
+    FROM activity a, cache c;
+"""
+
+# COUNT/SUM over the processlist and max_connections in one statement
+MYSQL_PROCESSLIST_QUERY = """
+    SELECT SUM(COMMAND != 'Sleep'), COUNT(*),
+           SUM(COMMAND NOT IN ('Sleep', 'Binlog Dump') AND TIME > 300), @@max_connections
+    FROM INFORMATION_SCHEMA.PROCESSLIST;
+"""
+MYSQL_DIGEST_QUERY = """
+    SELECT (SELECT COUNT(*) FROM performance_schema.events_statements_summary_by_digest
+            WHERE AVG_TIMER_WAIT > 5000000000000),
+           (SELECT CONCAT(SUBSTRING_INDEX(DIGEST_TEXT, ' ', 1), ' (', COUNT(*), ' queries)')
+            FROM performance_schema.events_statements_summary_by_digest
+            GROUP BY SUBSTRING_INDEX(DIGEST_TEXT, ' ', 1)
+            ORDER BY COUNT(*) DESC
+            LIMIT 1);
+"""
+# SHOW REPLICA STATUS needs MySQL 8.0.22+; older servers only know SHOW SLAVE STATUS
+MYSQL_REPLICA_QUERIES = ('SHOW REPLICA STATUS', 'SHOW SLAVE STATUS')
+
+
+def _int(value):
+    """int of a COUNT/SUM column (SUM over no rows is NULL)."""
+    return int(value or 0)
+
+
+def _connection_candidates(engine, driver, config_path):
+    """Connection parameters to try in order, like the client invocations of get_*_connection_*."""
+    candidates = []
+    if config_path:
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        section = CONFIG_SECTIONS[engine]
+        if config.has_section(section):
+            params = {key: value for key, value in config.items(section)
+                      if key in ('host', 'port', 'user', 'password', 'dbname', 'database')}
+            if 'port' in params:
+                params['port'] = int(params['port'])
+            candidates.append(params)
+    if engine == 'postgres':
+        # psql -U postgres (local socket), psql -h localhost -U postgres, psql (libpq/PG* defaults)
+        candidates += [{'user': 'postgres'}, {'host': 'localhost', 'user': 'postgres'}, {}]
+        for params in candidates:
+            params.setdefault('connect_timeout', CONNECT_TIMEOUT)
+            params['options'] = f'-c statement_timeout={STATEMENT_TIMEOUT * 1000}'
+        return candidates
+
+    # mysql (~/.my.cnf), mysql -u root over the local socket, mysql -h localhost
+    option_file = os.path.expanduser('~/.my.cnf')
+    if os.path.isfile(option_file):
+        key = 'option_files' if driver.name == 'mysql.connector' else 'read_default_file'
+        candidates.append({key: option_file})
+    candidates += [{'user': 'root', 'unix_socket': path} for path in MYSQL_SOCKETS if os.path.exists(path)]
+    candidates.append({'user': 'root', 'host': 'localhost'})
+    timeout_key = 'connection_timeout' if driver.name == 'mysql.connector' else 'connect_timeout'
+    for params in candidates:
+        if 'dbname' in params:
+            params['database'] = params.pop('dbname')
+        params.setdefault(timeout_key, CONNECT_TIMEOUT)
+    return candidates
+
+
+def connect(engine, driver, config_path=None):
+    """The first connection that succeeds, or None."""
+    for params in _connection_candidates(engine, driver, config_path):
+        try:
+            return driver.connect(**params)
+        except driver.sql_errors:
+            continue
+    return None
+
+
+def pg_metrics(cursor):
+    """Report lines of pg_performance_metrics, from one query."""
+    cursor.execute(PG_METRICS_QUERY)
+    active, total, max_connections, long_running, top_wait, busiest, replicating, lag, hit_ratio = cursor.fetchone()
+    lines = ["--- Database Activity ---",
+             f"Active Connections|{active}",
+             f"Total Connections|{total}",
+             f"Max Connections|{max_connections}",
+             "--- Query Performance ---",
+             f"Long Running Queries (>5min)|{long_running}"]
+    if top_wait is not None:
+        lines.append(f"Top Wait Event|{top_wait}")
+    lines.append("--- Database Performance Stats ---")
+    if busiest is not None:
+        lines.append(f"Database with Most Activity|{busiest}")
+    if replicating:
+        lines.append("--- Replication Performance ---")
+        if lag is not None:
+            lines.append(f"Replication Lag|{lag}")
+    if hit_ratio is not None:
+        lines.append(f"Cache Hit Ratio|{hit_ratio}%")
+    return lines
+
+
+def _global_status(cursor):
+    """{variable name: value} of SHOW GLOBAL STATUS."""
+    cursor.execute("SHOW GLOBAL STATUS")
+    return {name: value for name, value in cursor.fetchall()}
+
+
+def _replica_lag(driver, cursor):
+    """'Replication Lag' value if a source is configured, else None."""
+    for query in MYSQL_REPLICA_QUERIES:
+        try:
+            cursor.execute(query)
+        except driver.sql_errors:
+            continue
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        status = dict(zip((column[0] for column in cursor.description), row))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return 'Not replicating' if lag is None else f"{lag} seconds"
+    return None
+
+
+def mysql_metrics(cursor, driver):
+    """Report lines of mysql_performance_metrics."""
+    status = _global_status(cursor)
+    cursor.execute(MYSQL_PROCESSLIST_QUERY)
+    active, total, long_running, max_connections = cursor.fetchone()
+    lines = ["--- Connection Performance ---",
+             f"Active Connections|{_int(active)}",
+             f"Total Connections|{_int(total)}",
+             f"Max Connections|{max_connections}",
+             "--- Query Performance ---"]
+    try:
+        cursor.execute(MYSQL_DIGEST_QUERY)
+        slow, top_type = cursor.fetchone()
+        lines.append(f"Slow Queries (>5s)|{_int(slow)}")
+        if top_type is not None:
+            lines.append(f"Top Query Type|{top_type}")
+    except driver.sql_errors:
+        # performance_schema disabled or not readable
+        lines.append(f"Long Running Queries (>300s)|{_int(long_running)}")
+
+    lines.append("--- Storage Engine Performance ---")
+    # Same scale as the 'Buffer pool hit rate' of SHOW ENGINE INNODB STATUS, but since startup
+    requests = _int(status.get('Innodb_buffer_pool_read_requests'))
+    if requests:
+        misses = _int(status.get('Innodb_buffer_pool_reads'))
+        lines.append(f"InnoDB Hit Rate|{1000 - round(1000 * misses / requests)} / 1000")
+
+    lag = _replica_lag(driver, cursor)
+    if lag is not None:
+        lines += ["--- Replication Performance ---", f"Replication Lag|{lag}"]
+    return lines
+
+
+def mariadb_metrics(cursor, driver):
+    """Report lines of mariadb_performance_metrics."""
+    status = _global_status(cursor)
+    cursor.execute(MYSQL_PROCESSLIST_QUERY)
+    active, total, long_running, _ = cursor.fetchone()
+    lines = ["--- Connection Performance ---",
+             f"Active Connections|{_int(active)}",
+             f"Total Connections|{_int(total)}"]
+    if 'wsrep_cluster_size' in status:
+        lines += ["--- Galera Cluster Performance ---",
+                  f"Cluster Size|{status['wsrep_cluster_size']}",
+                  f"Cluster Status|{status.get('wsrep_cluster_status', '')}",
+                  f"Replication Queue|{status.get('wsrep_local_recv_queue_avg', '')} events"]
+    lines += ["--- Query Performance ---",
+              f"Long Running Queries (>300s)|{_int(long_running)}",
+              "--- Storage Performance ---"]
+    pages_total = _int(status.get('Innodb_buffer_pool_pages_total'))
+    if pages_total:
+        usage = 100 * _int(status.get('Innodb_buffer_pool_pages_data')) / pages_total
+        lines.append(f"InnoDB Buffer Pool Usage|{usage:.2f}%")
+    return lines
+
+
+def collect(engine, config_path=None):
+    """(exit code, report lines) for engine."""
+    try:
+        driver = load_postgres_driver() if engine == 'postgres' else load_mysql_driver()
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        return 2, []
+    conn = connect(engine, driver, config_path)
+    if conn is None:
+        print(f"Unable to connect to {engine}", file=sys.stderr)
+        return 1, []
+    try:
+        cursor = conn.cursor()
+        if engine == 'postgres':
+            return 0, pg_metrics(cursor)
+        if engine == 'mysql':
+            cursor.execute(f"SET SESSION max_execution_time = {STATEMENT_TIMEOUT * 1000}")
+            return 0, mysql_metrics(cursor, driver)
+        cursor.execute(f"SET SESSION max_statement_time = {STATEMENT_TIMEOUT}")
+        return 0, mariadb_metrics(cursor, driver)
+    except driver.sql_errors as e:
+        print(f"{engine} metrics query failed: {e}", file=sys.stderr)
+        return 1, []
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the performance metrics of a database in Name|Value lines.")
+    parser.add_argument('--engine', choices=ENGINES, required=True)
+    parser.add_argument('--config', metavar='FILE',
+                        help="CIS checker config file whose [postgresql]/[mysql]/[mariadb] section is tried first")
+    args = parser.parse_args(argv)
+
+    code, lines = collect(args.engine, args.config)
+    if lines:
+        print("\n".join(lines))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
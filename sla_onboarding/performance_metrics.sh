@@ -2,10 +2,38 @@
 # Performance Metrics Collection for Database Assessment
 # Focuses on key performance indicators relevant to Service Desk intervention timing
 
+PERF_COLLECTOR="${SCRIPT_DIR:-$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)}/performance_collector.py"
+
+# Prints the metrics of an engine collected over one connection by performance_collector.py.
+# Fails without output if python3, the driver or the connection is missing, so callers fall
+# back to the client tools. PERF_METRICS_CONFIG may name a CIS config file with credentials.
+collect_performance_metrics() {
+    local engine="$1"
+    local metrics status=0
+
+    if ! command -v python3 >/dev/null 2>&1 || [ ! -f "$PERF_COLLECTOR" ]; then
+        return 1
+    fi
+    metrics=$(timeout 30 python3 "$PERF_COLLECTOR" --engine "$engine" \
+        ${PERF_METRICS_CONFIG:+--config "$PERF_METRICS_CONFIG"} 2>/dev/null) || status=$?
+    if [ $status -eq 0 ]; then
+        printf '%s\n' "$metrics"
+        return 0
+    fi
+    log_debug "Metrics collector unavailable for $engine (exit $status), using the client tools"
+    return 1
+}
+
 # PostgreSQL Performance Metrics
 pg_performance_metrics() {
     echo "=== PostgreSQL Performance Metrics ==="
     
+    # All metrics over one connection; the per-metric client calls below are the fallback
+    if collect_performance_metrics postgres; then
+        echo ""
+        return 0
+    fi
+    
     # Get database connection info
     local conn_info=$(get_pg_connection_info)
     if [ -z "$conn_info" ]; then
@@ -79,6 +107,12 @@ pg_performance_metrics() {
 mysql_performance_metrics() {
     echo "=== MySQL Performance Metrics ==="
     
+    # All metrics over one connection; the per-metric client calls below are the fallback
+    if collect_performance_metrics mysql; then
+        echo ""
+        return 0
+    fi
+    
     # Get MySQL connection info
     local mysql_cmd=$(get_mysql_connection_cmd)
     if [ -z "$mysql_cmd" ]; then
@@ -155,6 +189,12 @@ mysql_performance_metrics() {
 mariadb_performance_metrics() {
     echo "=== MariaDB Performance Metrics ==="
     
+    # All metrics over one connection; the per-metric client calls below are the fallback
+    if collect_performance_metrics mariadb; then
+        echo ""
+        return 0
+    fi
+    
     # Get MariaDB connection info
     local mariadb_cmd=$(get_mariadb_connection_cmd)
     if [ -z "$mariadb_cmd" ]; then
@@ -0,0 +1,178 @@
+"""Collects and renders the main_cli.sh report as txt, csv or json in one streaming pass.
+
+main_cli.sh used to build the whole report in a bash string (one 'result+='
+per line, quadratic in the report size), escape quotes and commas by hand and
+expand it with 'echo -e', which broke JSON and CSV on backslashes and
+newlines. It now hands the report lines to this script together with the SLA
+assessment generate_sla_report produced; each line is written to --output (or
+stdout) as soon as it is read, escaped by the json and csv modules.
+
+The lines come from a spool file (--spool) or, in the legacy echo collection
+mode, NUL-separated on stdin. The spool is written by --collect, which
+main_cli.sh starts once per run with stdout redirected to the spool file: the
+stdout of every section goes through a pipe to the collector, which writes one
+record per line, tagged with the section (announced by a SECTION_MARK line)
+and the time it was read, so nothing of the report is held in memory.
+"""
+import argparse
+import csv
+import datetime
+import json
+import socket
+import sys
+import time
+from collections import namedtuple
+
+FORMATS = ('txt', 'csv', 'json')
+READ_CHUNK = 64 * 1024
+SECTION_MARK = b'\x1e'   # a line starting with it names the section whose output follows
+
+# Spool file lines: '<epoch seconds>\t<section>\t<text>\n'
+SpoolRecord = namedtuple('SpoolRecord', ['timestamp', 'section', 'text'])
+
+
+def read_records(stream, separator=b'\0'):
+    """Yields the separator-terminated records of a binary stream as str, without reading it whole.
+
+    Bytes that are not valid UTF-8 are kept with surrogateescape.
+    """
+    pending = b''
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        *records, pending = pending.split(separator)
+        for record in records:
+            yield record.decode('utf-8', 'surrogateescape')
+    if pending:
+        yield pending.decode('utf-8', 'surrogateescape')
+
+
+def collect(stream, spool):
+    """Writes every line of the binary stream to spool as a record tagged with section and time."""
+    section = b'-'
+    for line in stream:
+        line = line.rstrip(b'\n')
+        if line.startswith(SECTION_MARK):
+            section = line[len(SECTION_MARK):].replace(b'\t', b' ') or b'-'
+            continue
+        spool.write(b'%.3f\t%s\t%s\n' % (time.time(), section, line))
+    spool.flush()
+
+
+def read_spool(path):
+    """Yields the SpoolRecords of a spool file, one line at a time."""
+    with open(path, 'rb') as spool:
+        for line in spool:
+            timestamp, section, text = line.rstrip(b'\n').split(b'\t', 2)
+            yield SpoolRecord(float(timestamp), section.decode('utf-8', 'surrogateescape'),
+                              text.decode('utf-8', 'surrogateescape'))
+
+
+def _valid_text(line):
+    """line with undecodable bytes replaced, for output that must be valid UTF-8 (JSON)."""
+    return line.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace')
+
+
+def split_check(line):
+    """(check, value) of a report line: split at the first ':' or, failing that, the first '|'."""
+    for separator in (':', '|'):
+        if separator in line:
+            check, _, value = line.partition(separator)
+            return check, value[1:] if value.startswith(' ') else value
+    return line, ''
+
+
+def _timestamp(epoch=None):
+    """ISO 8601 local time with offset, like 'date -Iseconds'."""
+    moment = datetime.datetime.fromtimestamp(time.time() if epoch is None else epoch)
+    return moment.astimezone().isoformat(timespec='seconds')
+
+
+def render_json(records, out, sla, timestamp, hostname):
+    try:
+        assessment = json.loads(sla).get('sla_assessment')
+    except (ValueError, AttributeError):
+        assessment = {}
+    assessment = json.dumps(assessment, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+    out.write("{\n")
+    out.write(f'  "timestamp": {json.dumps(timestamp)},\n')
+    out.write(f'  "hostname": {json.dumps(hostname)},\n')
+    out.write(f'  "sla_assessment": {assessment},\n')
+    out.write('  "technical_checks": [')
+    separator = "\n"
+    for record in records:
+        out.write(f"{separator}    {json.dumps(_valid_text(record.text), ensure_ascii=False)}")
+        separator = ",\n"
+    out.write("\n  ]\n}\n")
+
+
+def render_csv(records, out, sla, timestamp, hostname):
+    out.write("Timestamp,Hostname,Check,Value\n")
+    out.write(f"{sla}\n")
+    out.write("\n# Technical Checks\n")
+    writer = csv.writer(out, lineterminator='\n')
+    for record in records:
+        # Spooled lines carry the time they were collected
+        when = _timestamp(record.timestamp) if record.timestamp is not None else timestamp
+        writer.writerow((when, hostname, *split_check(record.text)))
+
+
+def render_text(records, out, sla, timestamp, hostname):
+    out.write(f"{sla}\n\n")
+    out.write("=================================================================\n")
+    out.write("                    TECHNICAL ASSESSMENT\n")
+    out.write("=================================================================\n\n")
+    for record in records:
+        out.write(f"{record.text}\n")
+
+
+RENDERERS = {'txt': render_text, 'csv': render_csv, 'json': render_json}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect or render the main_cli.sh report.")
+    parser.add_argument('--format', choices=FORMATS, default='txt')
+    parser.add_argument('--output', metavar='FILE', help="write the report to FILE instead of stdout")
+    parser.add_argument('--sla', metavar='FILE', help="output of generate_sla_report in the same format")
+    parser.add_argument('--spool', metavar='FILE',
+                        help="render the lines of this spool file (default: NUL-separated lines on stdin)")
+    parser.add_argument('--collect', action='store_true',
+                        help="write the lines read on stdin as spool records to stdout and exit")
+    parser.add_argument('--sla-data', action='store_true',
+                        help="print the lines of --spool joined by a literal \\n, the input of generate_sla_report")
+    args = parser.parse_args(argv)
+
+    if args.collect:
+        collect(sys.stdin.buffer, sys.stdout.buffer)
+        return
+    if args.sla_data:
+        out = sys.stdout.buffer
+        for record in read_spool(args.spool):
+            out.write(record.text.encode('utf-8', 'surrogateescape') + b'\\n')
+        return
+
+    sla = ''
+    if args.sla:
+        with open(args.sla, encoding='utf-8', errors='replace') as f:
+            sla = f.read().rstrip('\n')  # as $(generate_sla_report ...) would give it
+    timestamp = _timestamp()
+    hostname = socket.gethostname()
+    if args.spool:
+        records = read_spool(args.spool)
+    else:
+        records = (SpoolRecord(None, None, line) for line in read_records(sys.stdin.buffer))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', errors='surrogateescape', newline='') as out:
+            RENDERERS[args.format](records, out, sla, timestamp, hostname)
+        print(f"Output written to {args.output}")
+    else:
+        out = open(sys.stdout.fileno(), 'w', encoding='utf-8', errors='surrogateescape', newline='', closefd=False)
+        with out:
+            RENDERERS[args.format](records, out, sla, timestamp, hostname)
+
+
+if __name__ == "__main__":
+    main()